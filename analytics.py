@@ -0,0 +1,114 @@
+import pandas as pd
+import streamlit as st
+
+import db
+import perf
+import summary
+
+# ==========================================
+# 📈 趨勢分析引擎：週/月統計讀彙總表，移動平均只讀最近一段明細
+# ==========================================
+TREND_COLUMNS = ['visceral_fat', 'weight', 'body_age', 'resting_hr']
+
+TREND_LABELS = {'visceral_fat': '內臟脂肪', 'weight': '體重(kg)', 'body_age': '身體年齡', 'resting_hr': '安靜心率'}
+
+# 週/月摘要表的顯示設定 (交給 st.dataframe 的 column_config)
+ROLLUP_COLUMNS = {
+    '_index': st.column_config.DateColumn('期間開始'),
+    **{col: st.column_config.NumberColumn(f'{label} (平均)', format='%.1f') for col, label in TREND_LABELS.items()},
+    'days': '紀錄天數', 'social_days': '應酬天數',
+    'water_goal_hit_rate': st.column_config.NumberColumn('喝水達標率', format='percent'),
+    'weekend_fasting_rate': st.column_config.NumberColumn('週末微斷食率', format='percent'),
+    'weekend_walk_rate': st.column_config.NumberColumn('週末漫步率', format='percent'),
+}
+
+# 移動平均只需要最近一段明細：圖表畫最近 CHART_DAYS 天，30 日平均再往前多讀 30 天
+CHART_DAYS = 365
+SQL_SELECT_RECENT = (
+    "SELECT date, visceral_fat, weight, body_age, resting_hr FROM health_logs "
+    "WHERE user_id=? AND date >= date((SELECT MAX(date) FROM health_logs WHERE user_id=?), ?) ORDER BY date"
+)
+
+# 週彙總以週一為期間開始
+WEEK_FREQ = 'W-MON'
+
+
+def compute_rolling(df):
+    # df 需含 SQL_SELECT_RECENT 的欄位且依日期遞增；整欄向量化，不逐列迴圈
+    index = pd.DatetimeIndex(pd.to_datetime(df['date'].to_numpy(), format='%Y-%m-%d'), name='date')
+    values = pd.DataFrame(
+        {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) for col in TREND_COLUMNS},
+        index=index,
+    )
+    return values.rolling('7D').mean(), values.rolling('30D').mean()
+
+
+def rollup_frame(rows):
+    # log_summary 的列 -> 以期間開始日為索引的平均值與比率；加總除以天數是向量化的 O(期間數)
+    sums = pd.DataFrame(rows, columns=('period_start',) + summary.SUMMARY_COLUMNS)
+    index = pd.DatetimeIndex(pd.to_datetime(sums['period_start'], format='%Y-%m-%d'), name='period_start')
+    sums = sums.drop(columns='period_start').set_axis(index)
+    frame = pd.DataFrame({
+        col: sums[f'{col}_sum'] / sums[f'{col}_days'].where(sums[f'{col}_days'] > 0) for col in TREND_COLUMNS
+    })
+    frame['days'] = sums['days']
+    frame['social_days'] = sums['social_days']
+    frame['water_goal_hit_rate'] = sums['water_goal_days'] / sums['days'].where(sums['days'] > 0)
+    weekend_days = sums['weekend_days'].where(sums['weekend_days'] > 0)
+    frame['weekend_fasting_rate'] = sums['weekend_fasting_days'] / weekend_days
+    frame['weekend_walk_rate'] = sums['weekend_walk_days'] / weekend_days
+    return frame, sums
+
+
+def compute_trends(recent, weekly_rows):
+    rolling_7, rolling_30 = compute_rolling(recent)
+    weekly, sums = rollup_frame(weekly_rows)
+    # 補上沒有紀錄的週 (平均為空、天數為 0)，週對週變化才是真正的相鄰兩週
+    weekly = weekly.asfreq(WEEK_FREQ)
+    weekly[['days', 'social_days']] = weekly[['days', 'social_days']].fillna(0)
+    weekly_means = weekly[TREND_COLUMNS]
+    days = int(sums['days'].sum())
+    weekend_days = int(sums['weekend_days'].sum())
+
+    return {
+        'rolling_7': rolling_7,
+        'rolling_30': rolling_30,
+        'weekly': weekly_means,
+        'week_over_week': weekly_means.diff(),
+        'weekly_social_days': weekly['social_days'],
+        'weekly_water_hit_rate': weekly['water_goal_hit_rate'],
+        'social_days': int(sums['social_days'].sum()),
+        'water_goal_hit_rate': sums['water_goal_days'].sum() / days if days else float('nan'),
+        'weekend_days': weekend_days,
+        'weekend_fasting_rate': sums['weekend_fasting_days'].sum() / weekend_days if weekend_days else float('nan'),
+        'weekend_walk_rate': sums['weekend_walk_days'].sum() / weekend_days if weekend_days else float('nan'),
+        'days': days,
+    }
+
+
+# 以使用者與其資料版本為鍵，只有該使用者存檔/修改/刪除之後才會重算；
+# 週統計讀彙總表 (O(週數))，明細只讀移動平均需要的最近一段
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _trends(_database, user_id, version):
+    recent = _database.read_frame(SQL_SELECT_RECENT, (user_id, user_id, f'-{CHART_DAYS + 30} days'))
+    weekly_rows = db.fetch_summary(_database, user_id, 'week')
+    with perf.span('analytics.compute_trends'):
+        return compute_trends(recent, weekly_rows)
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _rollup(_database, user_id, version, period):
+    return rollup_frame(db.fetch_summary(_database, user_id, period))[0]
+
+
+@perf.timed('analytics.load_trends')
+def load_trends(user_id):
+    database = db.get_db()
+    return _trends(database, user_id, database.data_version(user_id))
+
+
+@perf.timed('analytics.load_rollup')
+def load_rollup(user_id, period):
+    # period 為 'week' 或 'month'；回傳的 DataFrame 與快取共用，呼叫端請勿就地修改
+    database = db.get_db()
+    return _rollup(database, user_id, database.data_version(user_id), period)
@@ -1,112 +1,70 @@
+import time
+startup_begin = time.perf_counter()
+
 import streamlit as st
 import datetime
-import sqlite3
-import pandas as pd
-
-# ==========================================
-# 🛡️ 系統底層：本地資料庫與自動計算引擎
-# ==========================================
-def init_db():
-    conn = sqlite3.connect('fuxing_guardian_v4.db')
-    c = conn.cursor()
-    # 1. 確保基礎表存在 (舊版結構)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS health_logs (
-            date TEXT PRIMARY KEY,
-            actual_age INTEGER,
-            body_age INTEGER,
-            visceral_fat REAL,
-            muscle_mass REAL,
-            bmi REAL,
-            resting_hr INTEGER,
-            blood_pressure TEXT,
-            readiness_score INTEGER,
-            social_mode_active BOOLEAN,
-            micro_workouts_done INTEGER,
-            water_intake_cc INTEGER
-        )
-    ''')
-    conn.commit()
-
-    # 2. 🛡️ 終極升級防禦：使用 PRAGMA 掃描並自動擴充欄位 (破解 Streamlit Cloud 限制)
-    c.execute("PRAGMA table_info(health_logs)")
-    columns = [info[1] for info in c.fetchall()]
-
-    if 'height' not in columns:
-        c.execute("ALTER TABLE health_logs ADD COLUMN height REAL DEFAULT 170.0")
-    if 'weight' not in columns:
-        c.execute("ALTER TABLE health_logs ADD COLUMN weight REAL DEFAULT 70.0")
-
-    conn.commit()
-    conn.close()
-
-def calculate_readiness(vf, hr, bp_sys, body_age, actual_age, social_mode, micro_workouts, water_intake, water_goal):
-    base_score = 100
-    if vf > 10: base_score -= (vf - 10) * 1.5 
-    if hr > 65: base_score -= (hr - 65) * 2
-    if bp_sys > 130: base_score -= (bp_sys - 130) * 1 
-    
-    age_gap = body_age - actual_age
-    if age_gap > 0:
-        base_score -= age_gap * 1
-        
-    if social_mode: base_score -= 20
-    
-    base_score += (micro_workouts * 3)
-    if water_intake >= water_goal:
-        base_score += 5 
-        
-    return max(0, min(100, int(base_score)))
-
-def load_history():
-    conn = sqlite3.connect('fuxing_guardian_v4.db')
-    try:
-        # 💥 明確指定 14 個欄位
-        df = pd.read_sql_query("SELECT date, height, weight, actual_age, body_age, visceral_fat, muscle_mass, bmi, resting_hr, blood_pressure, readiness_score, social_mode_active, micro_workouts_done, water_intake_cc FROM health_logs ORDER BY date DESC", conn)
-    except:
-        df = pd.DataFrame()
-    conn.close()
-    return df
+import functools
+
+# pandas / analytics / transfer 只在打開對應區塊時才 import，冷啟動不載入
+import db
+import guides
+import history
+import perf
+import readiness
+from readiness import NORMAL_WATER_GOAL, SOCIAL_WATER_GOAL, calculate_readiness
+import state
+imports_done = time.perf_counter()
 
 st.set_page_config(page_title="復興守護者", page_icon="🛡️", layout="wide")
-init_db()
+perf.begin_rerun()
 
 today_date = datetime.date.today()
 today_str = today_date.strftime("%Y-%m-%d")
 is_weekend = today_date.weekday() >= 5 
 
+# ==========================================
+# 👥 使用者切換 (網址可帶 ?user=帳號 直接進入自己的頁面，或在側欄輸入帳號)
+#    只以主鍵查詢這一位使用者：不列出其他人的資料，使用者再多每次 rerun 的成本也不變
+# ==========================================
+if 'pending_user' in st.session_state:
+    st.session_state.user_id = st.session_state.pop('pending_user')
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = st.query_params.get('user', db.DEFAULT_USER)
+
+with perf.span("ui.profile"), st.sidebar:
+    st.header("👥 使用者")
+    user_id = st.text_input("目前使用者帳號", key='user_id').strip()
+    profile = None
+    if user_id != st.session_state.get('loaded_user'):
+        profile = db.fetch_profile(db.get_db(), user_id)
+        if profile is None:
+            # 帳號不存在：維持目前載入的使用者 (新 session 則用預設使用者)
+            st.error(f"找不到帳號「{user_id}」，請確認後重新輸入。")
+            user_id = st.session_state.get('loaded_user', db.DEFAULT_USER)
+    with st.expander("➕ 新增使用者"):
+        new_user_id = st.text_input("帳號 (英數字)").strip()
+        new_user_name = st.text_input("顯示名稱").strip()
+        if st.button("建立使用者") and new_user_id:
+            db.create_profile(db.get_db(), new_user_id, new_user_name or new_user_id)
+            st.session_state.pending_user = new_user_id
+            st.rerun()
+st.query_params['user'] = user_id
+
 # ==========================================
 # 🧠 狀態機初始化 
 # ==========================================
-if 'social_mode' not in st.session_state: st.session_state.social_mode = False
-
-if 'metrics' not in st.session_state: 
-    st.session_state.metrics = {
-        'height': 170.0, 'weight': 70.0,
-        'actual_age': 54, 'body_age': 69,
-        'vf': 25.0, 'muscle': 26.7, 'bmi': 33.8, 'hr': 63, 'bp_sys': 119, 'bp_dia': 79
-    }
-    
-if 'micro_workouts' not in st.session_state: st.session_state.micro_workouts = 0 
-if 'water_intake' not in st.session_state: st.session_state.water_intake = 0 
-
-water_goal = 3000 if st.session_state.social_mode else 2000
-
-if 'readiness_score' not in st.session_state:
-    st.session_state.readiness_score = calculate_readiness(
-        st.session_state.metrics['vf'], st.session_state.metrics['hr'], st.session_state.metrics['bp_sys'], 
-        st.session_state.metrics['body_age'], st.session_state.metrics['actual_age'],
-        st.session_state.social_mode, st.session_state.micro_workouts, st.session_state.water_intake, water_goal
-    )
+# 切換使用者、新 session 或跨日時，從資料庫載入該使用者的基準數值與今日已存的狀態
+if (st.session_state.get('loaded_user'), st.session_state.get('log_date')) != (user_id, today_str):
+    state.start_day(user_id, today_str, *(profile or db.fetch_profile(db.get_db(), user_id)))
 
 # ==========================================
-# 🎨 介面層：區長專屬動態儀表板
+# 🎨 介面層：個人專屬動態儀表板
 # ==========================================
 st.title("🛡️ 復興守護者")
-st.markdown(f"**蘇區長，早安。今天是 {today_str} {'(週末重置日)' if is_weekend else '(市政高壓期)'}**")
+st.markdown(f"**{st.session_state.display_name}，早安。今天是 {today_str} {'(週末重置日)' if is_weekend else '(市政高壓期)'}**")
 
 # --- 📥 今日數值輸入區 ---
-with st.expander("📥 點此輸入今日最新數值 (同步體脂計/血壓計)", expanded=False):
+with perf.span("ui.inputs"), st.expander("📥 點此輸入今日最新數值 (同步體脂計/血壓計)", expanded=False):
     col_a, col_b, col_c = st.columns(3)
     with col_a:
         new_height = st.number_input("身高 (cm)", value=st.session_state.metrics.get('height', 170.0), step=0.1)
@@ -123,256 +81,376 @@ with st.expander("📥 點此輸入今日最新數值 (同步體脂計/血壓計
         new_hr = st.number_input("安靜心率 (bpm)", value=st.session_state.metrics['hr'], step=1)
         
     if st.button("🔄 更新今日數值"):
-        st.session_state.metrics.update({
+        state.update_metrics({
             'height': new_height, 'weight': new_weight,
             'actual_age': new_actual_age, 'body_age': new_body_age,
             'vf': new_vf, 'muscle': new_muscle, 'bmi': new_bmi, 'hr': new_hr, 'bp_sys': new_bp_sys, 'bp_dia': new_bp_dia
         })
-        st.session_state.readiness_score = calculate_readiness(
-            new_vf, new_hr, new_bp_sys, new_body_age, new_actual_age, 
-            st.session_state.social_mode, st.session_state.micro_workouts, st.session_state.water_intake, water_goal
-        )
+        # 同步成該使用者的基準數值，下次開啟時直接帶入
+        db.update_profile_metrics(db.get_db(), user_id, st.session_state.metrics)
         st.rerun()
 
 st.divider()
 
-# --- 🔋 綜合狀態儀表板 ---
-st.subheader("🔋 今日身體狀態儀表板")
-col1, col2, col3 = st.columns(3)
-with col1:
-    if st.session_state.readiness_score >= 70:
-        st.metric("代謝綜合評分", f"{st.session_state.readiness_score}%", "狀態穩定")
-    else:
-        st.metric("代謝綜合評分", f"{st.session_state.readiness_score}%", "- 肝臟/代謝負載過重", delta_color="inverse")
-with col2:
-    st.metric("心血管防線 (血壓)", f"{st.session_state.metrics['bp_sys']}/{st.session_state.metrics['bp_dia']}", "優良防護中")
-with col3:
-    age_gap = st.session_state.metrics['body_age'] - st.session_state.metrics['actual_age']
-    if age_gap > 0:
-        st.metric("代謝老化指標 (身體年齡)", f"{st.session_state.metrics['body_age']} 歲", f"老化 +{age_gap} 歲", delta_color="inverse")
+# ==========================================
+# ⚡ 即時互動區：包成 st.fragment，按喝水/微訓練/應酬時只重跑這一區 (含評分)，
+#    不會重新跑使用者載入、歷史分頁與趨勢分析
+# ==========================================
+@st.fragment
+@perf.fragment_scope("live_panel")
+def live_panel():
+    # 點擊時已跨日 (回呼已切到新的一天)：整頁重跑，日期標題與週末模式才會跟著更新
+    if st.session_state.log_date != today_str:
+        st.rerun()
+    water_goal = state.water_goal()
+
+    # --- 🔋 綜合狀態儀表板 ---
+    st.subheader("🔋 今日身體狀態儀表板")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.session_state.readiness_score >= 70:
+            st.metric("代謝綜合評分", f"{st.session_state.readiness_score}%", "狀態穩定")
+        else:
+            st.metric("代謝綜合評分", f"{st.session_state.readiness_score}%", "- 肝臟/代謝負載過重", delta_color="inverse")
+    with col2:
+        st.metric("心血管防線 (血壓)", f"{st.session_state.metrics['bp_sys']}/{st.session_state.metrics['bp_dia']}", "優良防護中")
+    with col3:
+        age_gap = st.session_state.metrics['body_age'] - st.session_state.metrics['actual_age']
+        if age_gap > 0:
+            st.metric("代謝老化指標 (身體年齡)", f"{st.session_state.metrics['body_age']} 歲", f"老化 +{age_gap} 歲", delta_color="inverse")
+        else:
+            st.metric("代謝老化指標 (身體年齡)", f"{st.session_state.metrics['body_age']} 歲", f"年輕 {-age_gap} 歲", delta_color="normal")
+
+    st.divider()
+
+    # --- 擴充模組整合區 ---
+    if is_weekend:
+        st.subheader("🌲 【週末重置模式啟動】清空一週壓力與胰島素殘留")
+
+        # 勾選結果綁定 session_state，並隨今日日誌自動存檔 (週末重置達成率由彙總表統計)
+        weekend_fasting = st.checkbox("14小時微斷食：今日早餐延後至 10:00，清空胰島素。", key="weekend_fasting", on_change=state.toggle_weekend_reset)
+        weekend_walk = st.checkbox("大自然重置：進行 30 分鐘森林漫步，重置迷走神經。", key="weekend_walk", on_change=state.toggle_weekend_reset)
+
+        if not (weekend_fasting or weekend_walk):
+            if st.button("❌ 今日因公務沒空重置"):
+                st.error("已記錄：今日維持高壓狀態，請多喝水代謝！")
+        elif weekend_fasting and weekend_walk:
+            st.success("✨ 完美執行重置協議！")
     else:
-        st.metric("代謝老化指標 (身體年齡)", f"{st.session_state.metrics['body_age']} 歲", f"年輕 {-age_gap} 歲", delta_color="normal")
-
-st.divider()
+        st.subheader("⏱️ 零碎時間運動")
+        available_time = st.radio(f"{st.session_state.display_name}，您現在有多少空檔？", ["3 分鐘", "10 分鐘", "15 分鐘"], horizontal=True)
+        if "3 分鐘" in available_time: st.write("🪑 **辦公椅深蹲 (15下)** + 🧱 **靠牆伏地挺身 (15下)**")
+        elif "10 分鐘" in available_time: st.write("🚶‍♂️ **原地高抬腿 (3分鐘)** + 🪜 **階梯微喘 (5分鐘)** + 🫁 **深呼吸 (2分鐘)**")
+        else: st.write("⛰️ **微喘步道健行**：維持「微喘」連續步行 15 分鐘。")
+
+        if st.button("✅ 完成一次微訓練 (+3分)", on_click=state.complete_workout):
+            st.balloons()
+
+    st.divider()
+
+    # --- 💧 動態水杯 ---
+    st.subheader(f"💧 喝水 (目標: {water_goal} cc)")
+    progress = min(st.session_state.water_intake / water_goal, 1.0)
+    st.progress(progress)
+    st.write(f"目前已飲用：**{st.session_state.water_intake} cc**")
+
+    col_w1, col_w2 = st.columns(2)
+    with col_w1:
+        st.button("➕ 喝一杯水 (250cc)", on_click=state.drink, args=(250,))
+    with col_w2:
+        st.button("➕ 喝一瓶水 (500cc)", on_click=state.drink, args=(500,))
+
+    st.divider()
+
+    # --- 🗓️ 應酬防禦與酒精衝擊警告 ---
+    st.subheader("🗓️ 飲食控管與應酬防禦")
+    # 展開時才畫出四個分頁；內容由 guides.meal_guides() 預先整理並全行程共用
+    meal_panel = st.expander("🍽️ 點此查看：今日會議便當/桌菜破解法", expanded=False, on_change="rerun", key="meal_panel")
+    with meal_panel:
+        if meal_panel.open:
+            st.info(guides.MEAL_GUIDE_INTRO)
+            meal_guides = guides.meal_guides()
+            for tab_meal, (_, guide) in zip(st.tabs([label for label, _ in meal_guides]), meal_guides):
+                tab_meal.markdown(guide)
+
+    if st.session_state.social_mode:
+        st.error(f"🚨 酒精衝擊警報：內臟脂肪 (目前: {st.session_state.metrics['vf']}) 面臨核彈級風險")
+
+        st.markdown("### 🍷 酒精生理影響分析")
+        alc_type = st.selectbox("選擇今晚飲用的酒類：", ["🥃 烈酒 (威士忌/高粱)", "🍷 葡萄酒", "🍺 啤酒/調酒 (絕對禁忌)"])
+        alc_count = st.number_input("預計飲用杯數：", min_value=1, value=1)
+
+        burn_pause = alc_count * (1.5 if "烈酒" in alc_type else 1.0)
+
+        st.markdown(f"""
+        * 🛑 **燃脂停滯**：您的身體將有 **{burn_pause} 小時** 處於「零燃脂」狀態。這期間您吃下的任何澱粉都會**直接轉化為內臟脂肪**。
+        * ⚠️ **代謝老化加劇**：您的身體年齡已高達 **{st.session_state.metrics['body_age']}歲** (老化 +{st.session_state.metrics['body_age'] - st.session_state.metrics['actual_age']}歲)，解毒過程將繼續透支器官儲備。
+        * ☢️ **內臟脂肪核爆**：{'如果您喝的是啤酒，糖分與酒精的協同作用會讓脂肪囤積效率提高 200%！' if '啤酒' in alc_type else '請嚴守 1:1 水分法則，強迫肝臟降溫。'}
+        """)
 
-# --- 擴充模組整合區 ---
-if is_weekend:
-    st.subheader("🌲 【週末重置模式啟動】清空一週壓力與胰島素殘留")
-    
-    weekend_fasting = st.checkbox("14小時微斷食：今日早餐延後至 10:00，清空胰島素。")
-    weekend_walk = st.checkbox("大自然重置：進行 30 分鐘森林漫步，重置迷走神經。")
-    
-    if not (weekend_fasting or weekend_walk):
-        if st.button("❌ 區長今日因公務沒空重置"):
-            st.error("已記錄：今日維持高壓狀態，請多喝水代謝！")
-    elif weekend_fasting and weekend_walk:
-        st.success("✨ 完美執行重置協議！")
-else:
-    st.subheader("⏱️ 零碎時間運動")
-    available_time = st.radio("區長，您現在有多少空檔？", ["3 分鐘", "10 分鐘", "15 分鐘"], horizontal=True)
-    if "3 分鐘" in available_time: st.write("🪑 **辦公椅深蹲 (15下)** + 🧱 **靠牆伏地挺身 (15下)**")
-    elif "10 分鐘" in available_time: st.write("🚶‍♂️ **原地高抬腿 (3分鐘)** + 🪜 **階梯微喘 (5分鐘)** + 🫁 **深呼吸 (2分鐘)**")
-    else: st.write("⛰️ **微喘步道健行**：維持「微喘」連續步行 15 分鐘。")
-    
-    if st.button("✅ 完成一次微訓練 (+3分)"):
-        st.session_state.micro_workouts += 1
-        st.session_state.readiness_score = calculate_readiness(
-            st.session_state.metrics['vf'], st.session_state.metrics['hr'], st.session_state.metrics['bp_sys'], 
-            st.session_state.metrics['body_age'], st.session_state.metrics['actual_age'],
-            st.session_state.social_mode, st.session_state.micro_workouts, st.session_state.water_intake, water_goal
-        )
-        st.balloons()
-        st.rerun()
+        st.button("✅ 應酬平安結束 (啟動 14H排毒協議)", on_click=state.set_social_mode, args=(False,))
+    else:
+        col_soc1, col_soc2 = st.columns(2)
+        with col_soc1:
+            st.button("🍷 臨時追加應酬 (啟動生理損害控管)", on_click=state.set_social_mode, args=(True,))
+        with col_soc2:
+            if st.button("✅ 今日沒喝酒"):
+                st.success("✨ 完美防禦！今日沒喝酒，維持高效率燃脂！")
 
-st.divider()
 
-# --- 💧 動態水杯 ---
-st.subheader(f"💧 喝水 (目標: {water_goal} cc)")
-progress = min(st.session_state.water_intake / water_goal, 1.0)
-st.progress(progress)
-st.write(f"目前已飲用：**{st.session_state.water_intake} cc**")
-
-col_w1, col_w2 = st.columns(2)
-with col_w1:
-    if st.button("➕ 喝一杯水 (250cc)"):
-        st.session_state.water_intake += 250
-        st.session_state.readiness_score = calculate_readiness(st.session_state.metrics['vf'], st.session_state.metrics['hr'], st.session_state.metrics['bp_sys'], st.session_state.metrics['body_age'], st.session_state.metrics['actual_age'], st.session_state.social_mode, st.session_state.micro_workouts, st.session_state.water_intake, water_goal)
-        st.rerun()
-with col_w2:
-    if st.button("➕ 喝一瓶水 (500cc)"):
-        st.session_state.water_intake += 500
-        st.session_state.readiness_score = calculate_readiness(st.session_state.metrics['vf'], st.session_state.metrics['hr'], st.session_state.metrics['bp_sys'], st.session_state.metrics['body_age'], st.session_state.metrics['actual_age'], st.session_state.social_mode, st.session_state.micro_workouts, st.session_state.water_intake, water_goal)
-        st.rerun()
+live_panel()
 
 st.divider()
 
-# --- 🗓️ 應酬防禦與酒精衝擊警告 ---
-st.subheader("🗓️ 飲食控管與應酬防禦")
-with st.expander("🍽️ 點此查看：今日會議便當/桌菜破解法", expanded=False):
-    st.info("💡 核心邏輯：控制進食順序，避免血糖飆升囤積脂肪。")
-    
-    tab_bento, tab_banquet, tab_western, tab_japanese = st.tabs(["🍱 台式會議便當", "🥢 中式桌菜/合菜", "🍔 西式餐飲", "🍣 日式料理"])
-    
-    with tab_bento:
-        st.markdown("""
-        * **進食順序**：先吃配菜 (蔬菜) ➔ 主菜 (肉類) ➔ 白飯最後。
-        * **防禦策略**：炸排骨/炸雞腿 **務必去皮**；滷肉/控肉避開肥肉。
-        * **減量原則**：白飯最多吃一半，底層吸滿油汁的飯絕對不吃。
-        """)
-    with tab_banquet:
-        st.markdown("""
-        * **進食順序**：先喝清湯 ➔ 蔬菜 ➔ 海鮮/瘦肉 ➔ 澱粉最後。
-        * **防禦策略**：**絕對避開勾芡** (如羹湯、糖醋、佛跳牆)，這些是隱形糖油炸彈。
-        * **飲品控制**：果汁與含糖飲料是地雷，請全程替換為無糖茶或溫水。
-        """)
-    with tab_western:
-        st.markdown("""
-        * **防禦策略**：漢堡麵包只吃一半 (或只吃下半層)；披薩餅皮邊緣少吃。
-        * **配餐替換**：薯條換成生菜沙拉 (醬汁減半或不加) 或無糖飲料。
-        """)
-    with tab_japanese:
-        st.markdown("""
-        * **隱形陷阱**：壽司的「醋飯」含有大量糖分，建議優先選擇生魚片 (刺身) 或烤魚。
-        * **防禦策略**：先吃毛豆、茶碗蒸墊胃，減緩血糖上升速度。
-        """)
-
-if st.session_state.social_mode:
-    st.error("🚨 酒精衝擊警報：內臟脂肪 (目前: 25) 面臨核彈級風險")
-    
-    st.markdown("### 🍷 酒精生理影響分析")
-    alc_type = st.selectbox("選擇今晚飲用的酒類：", ["🥃 烈酒 (威士忌/高粱)", "🍷 葡萄酒", "🍺 啤酒/調酒 (絕對禁忌)"])
-    alc_count = st.number_input("預計飲用杯數：", min_value=1, value=1)
-    
-    burn_pause = alc_count * (1.5 if "烈酒" in alc_type else 1.0)
-    
-    st.markdown(f"""
-    * 🛑 **燃脂停滯**：您的身體將有 **{burn_pause} 小時** 處於「零燃脂」狀態。這期間您吃下的任何澱粉都會**直接轉化為內臟脂肪**。
-    * ⚠️ **代謝老化加劇**：您的身體年齡已高達 **{st.session_state.metrics['body_age']}歲** (老化 +{st.session_state.metrics['body_age'] - st.session_state.metrics['actual_age']}歲)，解毒過程將繼續透支器官儲備。
-    * ☢️ **內臟脂肪核爆**：{'如果您喝的是啤酒，糖分與酒精的協同作用會讓脂肪囤積效率提高 200%！' if '啤酒' in alc_type else '請嚴守 1:1 水分法則，強迫肝臟降溫。'}
-    """)
-
-    if st.button("✅ 應酬平安結束 (啟動 14H排毒協議)"):
-        st.session_state.social_mode = False
-        st.session_state.readiness_score = calculate_readiness(st.session_state.metrics['vf'], st.session_state.metrics['hr'], st.session_state.metrics['bp_sys'], st.session_state.metrics['body_age'], st.session_state.metrics['actual_age'], False, st.session_state.micro_workouts, st.session_state.water_intake, 2000)
-        st.rerun()
-else:
-    col_soc1, col_soc2 = st.columns(2)
-    with col_soc1:
-        if st.button("🍷 臨時追加應酬 (啟動生理損害控管)"):
-            st.session_state.social_mode = True
-            st.session_state.readiness_score = calculate_readiness(st.session_state.metrics['vf'], st.session_state.metrics['hr'], st.session_state.metrics['bp_sys'], st.session_state.metrics['body_age'], st.session_state.metrics['actual_age'], True, st.session_state.micro_workouts, st.session_state.water_intake, 3000)
-            st.rerun()
-    with col_soc2:
-        if st.button("✅ 今日沒喝酒"):
-            st.success("✨ 完美防禦！今日沒喝酒，維持高效率燃脂！")
+# --- 📈 長期趨勢 (展開時才 import pandas/analytics 並計算；週/月統計讀彙總表，寫入後才重算) ---
+trends_panel = st.expander("📈 長期趨勢分析", expanded=False, on_change="rerun", key="trends_panel")
+with perf.span("ui.trends"), trends_panel:
+    if trends_panel.open:
+        import pandas as pd
+        import analytics
+
+        trends = analytics.load_trends(user_id)
+        if trends['days']:
+            col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+            last_week = trends['weekly'].iloc[-1]
+            last_delta = trends['week_over_week'].iloc[-1]
+            # 最後一週是有紀錄的最後一週，不一定是本週：不是本週時標出那一週的起始日
+            last_week_start = trends['weekly'].index[-1].date()
+            if last_week_start == today_date - datetime.timedelta(days=today_date.weekday()):
+                week_label, delta_label = "本週平均", "vs 上週"
+            else:
+                week_label, delta_label = f"{last_week_start:%Y-%m-%d} 當週平均", "vs 前一週"
+            for col_t, key in zip((col_t1, col_t2, col_t3, col_t4), analytics.TREND_COLUMNS):
+                with col_t:
+                    # 這四項都是越低越好，所以下降顯示綠色
+                    st.metric(
+                        f"{analytics.TREND_LABELS[key]} ({week_label})",
+                        "—" if pd.isna(last_week[key]) else f"{last_week[key]:.1f}",
+                        None if pd.isna(last_delta[key]) else f"{last_delta[key]:+.1f} {delta_label}",
+                        delta_color="inverse",
+                    )
+
+            col_t5, col_t6, col_t_bp = st.columns(3)
+            with col_t5:
+                st.metric("累計應酬天數", f"{trends['social_days']} 天", f"共 {trends['days']} 天紀錄", delta_color="off")
+            with col_t6:
+                st.metric("喝水達標率", f"{trends['water_goal_hit_rate']:.0%}")
+            with col_t_bp:
+                st.metric("收縮壓 > 130 的天數", f"{history.count_high_bp_days(user_id, 130)} 天")
+
+            if trends['weekend_days']:
+                col_t_fast, col_t_walk = st.columns(2)
+                with col_t_fast:
+                    st.metric("週末微斷食達成率", f"{trends['weekend_fasting_rate']:.0%}", f"共 {trends['weekend_days']} 個週末日", delta_color="off")
+                with col_t_walk:
+                    st.metric("週末森林漫步達成率", f"{trends['weekend_walk_rate']:.0%}")
+
+            trend_key = st.selectbox("趨勢指標", analytics.TREND_COLUMNS, format_func=analytics.TREND_LABELS.get)
+            # 圖表只畫最近一年，避免把整段歷史送到瀏覽器
+            window = trends['rolling_7'].index[-1] - pd.Timedelta(days=365)
+            st.line_chart(pd.DataFrame({
+                '7 日平均': trends['rolling_7'][trend_key],
+                '30 日平均': trends['rolling_30'][trend_key],
+            })[window:])
+            col_t7, col_t8 = st.columns(2)
+            with col_t7:
+                st.caption("每週應酬天數")
+                st.bar_chart(trends['weekly_social_days'][window:])
+            with col_t8:
+                st.caption("每週喝水達標率")
+                st.line_chart(trends['weekly_water_hit_rate'][window:])
+
+            st.caption("每月摘要 (新到舊)")
+            st.dataframe(analytics.load_rollup(user_id, 'month').iloc[::-1], column_config=analytics.ROLLUP_COLUMNS, width='stretch')
+        else:
+            st.info("累積幾天日誌後，這裡會顯示長期趨勢。")
 
 st.divider()
 
 # --- 💾 存檔紀錄 ---
 if st.button("💾 儲存今日完整日誌"):
-    bp_str = f"{st.session_state.metrics['bp_sys']}/{st.session_state.metrics['bp_dia']}"
-    conn = sqlite3.connect('fuxing_guardian_v4.db')
-    c = conn.cursor()
-    c.execute('''
-        INSERT OR REPLACE INTO health_logs 
-        (date, height, weight, actual_age, body_age, visceral_fat, muscle_mass, bmi, resting_hr, blood_pressure, readiness_score, social_mode_active, micro_workouts_done, water_intake_cc) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        today_str, st.session_state.metrics['height'], st.session_state.metrics['weight'],
-        st.session_state.metrics['actual_age'], st.session_state.metrics['body_age'], 
-        st.session_state.metrics['vf'], st.session_state.metrics['muscle'], 
-        st.session_state.metrics['bmi'], st.session_state.metrics['hr'], bp_str,
-        st.session_state.readiness_score, st.session_state.social_mode, 
-        st.session_state.micro_workouts, st.session_state.water_intake
-    ))
-    conn.commit()
-    conn.close()
-    st.success("✅ 區長，今日完整日誌已成功儲存！")
+    # 經由 journal 立即寫入，避免之後才寫入的舊快照蓋掉這次儲存
+    if state.save_today():
+        st.success(f"✅ {st.session_state.display_name}，今日完整日誌已成功儲存！")
+    else:
+        st.error("❌ 儲存失敗：資料庫暫時無法寫入，今日狀態已保留並會自動重試，請稍後再按一次。")
 
 # ==========================================
-# 📖 歷史紀錄與管理模組
+# 📖 歷史紀錄與管理模組 (展開後才查詢；切換分頁時只執行目前開啟的那一頁)
 # ==========================================
 st.divider()
-st.subheader("📖 歷史健康日誌管理")
-
-tab1, tab2 = st.tabs(["📊 查看歷史紀錄", "✏️ 修改 / 刪除紀錄"])
-
-with tab1:
-    history_df = load_history()
-    if not history_df.empty:
-        display_df = history_df.copy()
-        display_df.columns = ['日期', '身高(cm)', '體重(kg)', '實際年齡', '身體年齡', '內臟脂肪', '骨骼肌(%)', 'BMI', '安靜心率', '血壓(mmHg)', '綜合評分', '有應酬?', '微訓練(次)', '喝水量(cc)']
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
-    else:
-        st.info("目前還沒有紀錄喔！請按下方的儲存按鈕來建立第一筆日誌。")
-
-with tab2:
-    if not history_df.empty:
-        dates_list = history_df['date'].tolist()
-        selected_date = st.selectbox("請選擇要修改的日期：", dates_list)
-        
-        # 讀取該日的舊資料以供修改
-        conn = sqlite3.connect('fuxing_guardian_v4.db')
-        c = conn.cursor()
-        c.execute("SELECT height, weight, actual_age, body_age, visceral_fat, muscle_mass, bmi, resting_hr, blood_pressure, social_mode_active, micro_workouts_done, water_intake_cc FROM health_logs WHERE date=?", (selected_date,))
-        row = c.fetchone()
-        conn.close()
-
-        if row:
-            height, weight, actual_age, body_age, vf, muscle, bmi, hr, bp, social, workouts, water = row
-            try:
-                bp_sys, bp_dia = map(int, bp.split('/'))
-            except:
-                bp_sys, bp_dia = 120, 80
-
-            st.caption(f"正在編輯：**{selected_date}** 的日誌")
+history_panel = st.expander("📖 歷史健康日誌管理", expanded=False, on_change="rerun", key="history_panel")
+with history_panel:
+    if history_panel.open:
+        bounds = history.date_bounds(user_id)
+        if bounds:
+            first_date = datetime.date.fromisoformat(bounds[0])
+            last_date = datetime.date.fromisoformat(bounds[1])
+
+        tab1, tab2, tab3 = st.tabs(["📊 查看歷史紀錄", "✏️ 修改 / 刪除紀錄", "📦 匯入 / 匯出"], on_change="rerun", key="history_tab")
+
+        with perf.span("ui.history_tab"), tab1:
+            if tab1.open:
+                if bounds:
+                    col_h1, col_h2, col_h3 = st.columns([2, 1, 1])
+                    with col_h1:
+                        date_range = st.date_input("日期範圍", value=(first_date, last_date), min_value=first_date, max_value=last_date)
+                    # 選取範圍途中只會拿到起始日，先當作單日查詢
+                    range_start = date_range[0] if date_range else first_date
+                    range_end = date_range[1] if len(date_range) > 1 else range_start
+                    start_str, end_str = range_start.strftime("%Y-%m-%d"), range_end.strftime("%Y-%m-%d")
+
+                    with col_h2:
+                        page_size = st.selectbox("每頁筆數", history.PAGE_SIZES)
+                    total_rows = history.count_logs(user_id, start_str, end_str)
+                    total_pages = max(1, -(-total_rows // page_size))
+                    with col_h3:
+                        page = st.number_input("頁數", min_value=1, max_value=total_pages, value=1, step=1)
+
+                    page_df = history.load_page(user_id, start_str, end_str, page_size, page - 1)
+                    # 只改顯示標題，不複製整張表
+                    st.dataframe(page_df, column_config=history.COLUMN_LABELS, width='stretch', hide_index=True)
+                    st.caption(f"共 {total_rows} 筆，第 {page} / {total_pages} 頁")
+                else:
+                    st.info("目前還沒有紀錄喔！請按下方的儲存按鈕來建立第一筆日誌。")
+
+        with perf.span("ui.edit_tab"), tab2:
+            if tab2.open:
+                if bounds:
+                    # 只在選定日期時讀取那一筆，不再把所有日期塞進下拉選單
+                    picked_date = st.date_input("請選擇要修改的日期：", value=last_date, min_value=first_date, max_value=last_date)
+                    selected_date = picked_date.strftime("%Y-%m-%d")
+
+                    # 讀取該日的舊資料以供修改
+                    row = db.fetch_log(db.get_db(), user_id, selected_date)
+
+                    if row:
+                        height, weight, actual_age, body_age, vf, muscle, bmi, hr, bp_sys, bp_dia, social, workouts, water, fasting, walk, bp_text = row
+                        # 舊版匯入可能留下空白欄位，改用該使用者的基準數值，避免表單無法開啟
+                        height, weight, actual_age, body_age, vf, muscle, bmi, hr = (
+                            st.session_state.metrics[key] if value is None else value
+                            for key, value in zip(('height', 'weight', 'actual_age', 'body_age', 'vf', 'muscle', 'bmi', 'hr'), row)
+                        )
+                        workouts, water = workouts or 0, water or 0
+                        # 舊資料的血壓字串無法解析時，遷移不會回填數值欄位：提示使用者，沒填新數值就保留原字串
+                        bp_unparsed = bp_sys is None or bp_dia is None
+                        if bp_unparsed:
+                            st.warning(f"⚠️ 這天的血壓紀錄「{bp_text}」無法解析，請重新輸入收縮壓/舒張壓；留空則保留原紀錄。")
+
+                        st.caption(f"正在編輯：**{selected_date}** 的日誌")
             
-            with st.container(border=True):
-                col_e1, col_e2, col_e3 = st.columns(3)
-                with col_e1:
-                    e_height = st.number_input("身高 (cm)", value=float(height) if height else 170.0, step=0.1, key="eheight")
-                    e_actual_age = st.number_input("實際年齡", value=int(actual_age), step=1, key="eactualage")
-                    e_vf = st.number_input("內臟脂肪", value=float(vf), step=0.5, key="evf")
-                    e_bp_sys = st.number_input("收縮壓 (高壓)", value=int(bp_sys), step=1, key="ebpsys")
-                    e_water = st.number_input("喝水量 (cc)", value=int(water), step=100, key="ewater")
-                with col_e2:
-                    e_weight = st.number_input("體重 (kg)", value=float(weight) if weight else 70.0, step=0.1, key="eweight")
-                    e_body_age = st.number_input("身體年齡", value=int(body_age), step=1, key="ebodyage")
-                    e_muscle = st.number_input("骨骼肌 (%)", value=float(muscle), step=0.1, key="emuscle")
-                    e_bp_dia = st.number_input("舒張壓 (低壓)", value=int(bp_dia), step=1, key="ebpdia")
-                    e_workouts = st.number_input("微訓練 (次數)", value=int(workouts), step=1, key="eworkouts")
-                with col_e3:
-                    e_bmi = st.number_input("BMI", value=float(bmi), step=0.1, key="ebmi")
-                    e_hr = st.number_input("安靜心率", value=int(hr), step=1, key="ehr")
+                        with st.container(border=True):
+                            col_e1, col_e2, col_e3 = st.columns(3)
+                            with col_e1:
+                                e_height = st.number_input("身高 (cm)", value=float(height), step=0.1, key="eheight")
+                                e_actual_age = st.number_input("實際年齡", value=int(actual_age), step=1, key="eactualage")
+                                e_vf = st.number_input("內臟脂肪", value=float(vf), step=0.5, key="evf")
+                                e_bp_sys = st.number_input("收縮壓 (高壓)", value=None if bp_unparsed else int(bp_sys), step=1, key="ebpsys")
+                                e_water = st.number_input("喝水量 (cc)", value=int(water), step=100, key="ewater")
+                            with col_e2:
+                                e_weight = st.number_input("體重 (kg)", value=float(weight), step=0.1, key="eweight")
+                                e_body_age = st.number_input("身體年齡", value=int(body_age), step=1, key="ebodyage")
+                                e_muscle = st.number_input("骨骼肌 (%)", value=float(muscle), step=0.1, key="emuscle")
+                                e_bp_dia = st.number_input("舒張壓 (低壓)", value=None if bp_unparsed else int(bp_dia), step=1, key="ebpdia")
+                                e_workouts = st.number_input("微訓練 (次數)", value=int(workouts), step=1, key="eworkouts")
+                            with col_e3:
+                                e_bmi = st.number_input("BMI", value=float(bmi), step=0.1, key="ebmi")
+                                e_hr = st.number_input("安靜心率", value=int(hr), step=1, key="ehr")
                 
-                e_social = st.checkbox("當天有應酬嗎？", value=bool(social), key="esocial")
-
-                col_btn1, col_btn2 = st.columns(2)
-                with col_btn1:
-                    if st.button("💾 更新這筆紀錄", type="primary", use_container_width=True):
-                        e_bp_str = f"{e_bp_sys}/{e_bp_dia}"
-                        e_goal = 3000 if e_social else 2000
-                        e_score = calculate_readiness(e_vf, e_hr, e_bp_sys, e_body_age, e_actual_age, e_social, e_workouts, e_water, e_goal)
+                            e_social = st.checkbox("當天有應酬嗎？", value=bool(social), key="esocial")
+                            # 週末重置只在週六、日有意義，平日沿用原值
+                            if picked_date.weekday() >= 5:
+                                e_fasting = st.checkbox("有完成 14 小時微斷食", value=bool(fasting), key="efasting")
+                                e_walk = st.checkbox("有完成 30 分鐘森林漫步", value=bool(walk), key="ewalk")
+                            else:
+                                e_fasting, e_walk = bool(fasting), bool(walk)
+
+                            col_btn1, col_btn2 = st.columns(2)
+                            with col_btn1:
+                                if st.button("💾 更新這筆紀錄", type="primary", width='stretch'):
+                                    if e_bp_sys is None or e_bp_dia is None:
+                                        # 沒有完整的新數值：保留原字串，數值欄位維持 NULL，評分不扣血壓分 (與批次重算一致)
+                                        e_bp_str, e_bp_sys, e_bp_dia, e_bp_score = bp_text, None, None, 0
+                                    else:
+                                        e_bp_str, e_bp_score = f"{e_bp_sys}/{e_bp_dia}", e_bp_sys
+                                    e_goal = SOCIAL_WATER_GOAL if e_social else NORMAL_WATER_GOAL
+                                    e_score = calculate_readiness(e_vf, e_hr, e_bp_score, e_body_age, e_actual_age, e_social, e_workouts, e_water, e_goal)
                         
-                        conn = sqlite3.connect('fuxing_guardian_v4.db')
-                        c = conn.cursor()
-                        c.execute('''
-                            UPDATE health_logs 
-                            SET height=?, weight=?, actual_age=?, body_age=?, visceral_fat=?, muscle_mass=?, bmi=?, resting_hr=?, blood_pressure=?, readiness_score=?, social_mode_active=?, micro_workouts_done=?, water_intake_cc=?
-                            WHERE date=?
-                        ''', (e_height, e_weight, e_actual_age, e_body_age, e_vf, e_muscle, e_bmi, e_hr, e_bp_str, e_score, e_social, e_workouts, e_water, selected_date))
-                        conn.commit()
-                        conn.close()
-                        st.success(f"✅ {selected_date} 的紀錄已成功更新！")
-                        st.rerun()
-                with col_btn2:
-                    if st.button("🗑️ 刪除這筆紀錄", use_container_width=True):
-                        conn = sqlite3.connect('fuxing_guardian_v4.db')
-                        c = conn.cursor()
-                        c.execute("DELETE FROM health_logs WHERE date=?", (selected_date,))
-                        conn.commit()
-                        conn.close()
-                        st.warning(f"🗑️ {selected_date} 的紀錄已刪除！")
-                        st.rerun()
-    else:
-        st.write("目前沒有可修改的歷史紀錄。")
+                                    state.forget_day(user_id, selected_date)
+                                    db.update_log(db.get_db(), user_id, selected_date, {
+                                        'height': e_height, 'weight': e_weight, 'actual_age': e_actual_age, 'body_age': e_body_age,
+                                        'visceral_fat': e_vf, 'muscle_mass': e_muscle, 'bmi': e_bmi, 'resting_hr': e_hr,
+                                        'blood_pressure': e_bp_str, 'bp_systolic': e_bp_sys, 'bp_diastolic': e_bp_dia, 'readiness_score': e_score, 'social_mode_active': e_social,
+                                        'micro_workouts_done': e_workouts, 'water_intake_cc': e_water,
+                                        'weekend_fasting': e_fasting, 'weekend_walk': e_walk,
+                                    })
+                                    st.success(f"✅ {selected_date} 的紀錄已成功更新！")
+                                    st.rerun()
+                            with col_btn2:
+                                if st.button("🗑️ 刪除這筆紀錄", width='stretch'):
+                                    state.forget_day(user_id, selected_date)
+                                    db.delete_log(db.get_db(), user_id, selected_date)
+                                    st.warning(f"🗑️ {selected_date} 的紀錄已刪除！")
+                                    st.rerun()
+                    else:
+                        st.info(f"{selected_date} 沒有紀錄，請改選其他日期。")
+                else:
+                    st.write("目前沒有可修改的歷史紀錄。")
+
+                # 評分公式調整後，一次把所有歷史紀錄重算並寫回
+                if bounds:
+                    st.divider()
+                    if st.button("🔁 以最新公式重算全部評分", width='stretch'):
+                        updated = readiness.recompute_all_scores(db.get_db(), user_id)
+                        st.success(f"✅ 已重新計算，共更新 {updated} 筆紀錄的綜合評分。")
+
+        with perf.span("ui.transfer_tab"), tab3:
+            if tab3.open:
+                import transfer
+
+                uploaded = st.file_uploader("匯入體脂計 / 血壓計匯出檔 (CSV 或 Parquet)", type=['csv', 'parquet'])
+                st.caption(f"必要欄位：{', '.join(transfer.REQUIRED_COLUMNS)}；血壓格式為「收縮壓/舒張壓」，同日期的紀錄會被覆蓋；沒有 user_id 欄位時匯入到目前使用者。")
+                if uploaded is not None and st.button("📥 開始匯入", type="primary"):
+                    try:
+                        imported = transfer.import_file(db.get_db(), uploaded, transfer.detect_format(uploaded.name), user_id=user_id)
+                    except (ValueError, RuntimeError) as exc:
+                        st.error(f"匯入失敗：{exc}")
+                    else:
+                        st.success(f"✅ 已匯入 {imported} 筆紀錄！")
+
+                if bounds:
+                    # 匯出範圍與「查看歷史紀錄」分頁各自獨立 (只有開啟中的分頁會執行)
+                    export_range = st.date_input("匯出日期範圍", value=(first_date, last_date), min_value=first_date, max_value=last_date, key="export_range")
+                    export_start = export_range[0] if export_range else first_date
+                    export_end = export_range[1] if len(export_range) > 1 else export_start
+                    start_str, end_str = export_start.strftime("%Y-%m-%d"), export_end.strftime("%Y-%m-%d")
+                    # 按下才在背景逐批產生檔案，不會拖慢每次 rerun
+                    st.download_button(
+                        f"📤 匯出 {start_str} ~ {end_str} 的紀錄 (CSV)",
+                        data=functools.partial(transfer.csv_file, db.get_db(), user_id, start_str, end_str),
+                        file_name=f"fuxing_guardian_{start_str}_{end_str}.csv",
+                        mime="text/csv",
+                    )
+
+# ==========================================
+# 🚀 冷啟動量測：每個行程只記錄第一次 rerun (import + 首次渲染)
+# ==========================================
+perf.record_startup(imports_done - startup_begin, time.perf_counter() - startup_begin)
+
+# ==========================================
+# 🐞 效能除錯面板 (FUXING_PERF=1 時才會出現)
+# ==========================================
+perf_summary = perf.end_rerun()
+if perf_summary:
+    with st.sidebar.expander("🐞 上一次 rerun 效能明細", expanded=False):
+        col_p1, col_p2, col_p3 = st.columns(3)
+        col_p1.metric("總耗時", f"{perf_summary['total_ms']:.0f} ms")
+        col_p2.metric("查詢數", perf_summary['queries'])
+        col_p3.metric("讀寫列數", perf_summary['rows'])
+        st.caption(f"本行程冷啟動：import {perf.startup['import_ms']:.0f} ms，import + 首次渲染 {perf.startup['first_render_ms']:.0f} ms")
+        st.dataframe(
+            sorted(({'區段': name, '耗時(ms)': span['ms'], '次數': span['calls']} for name, span in perf_summary['spans'].items()),
+                   key=lambda item: -item['耗時(ms)']),
+            width='stretch', hide_index=True,
+        )
+        st.download_button("📤 匯出累計直方圖 (Prometheus)", data=perf.prometheus_text, file_name="fuxing_metrics.prom", mime="text/plain")
@@ -0,0 +1,220 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# 從 repo 根目錄或 benchmarks/ 執行都能 import app 的模組
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# AppTest 不支援 fragment 單獨重跑 (點擊一律整頁重跑)；開啟 perf 量測，
+# 才能從 ui.live_panel 區段讀出使用者實際點擊時 fragment 重跑的成本
+os.environ.setdefault('FUXING_PERF', '1')
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import db
+import migrations
+import perf
+import summary
+
+# ==========================================
+# ⏱️ 無頭效能基準：用 AppTest 跑 app.py，量測每次 rerun 的成本
+#   python benchmarks/bench_app.py [--sizes 1000 10000 100000] [--sessions 8] [--output bench.json]
+# ==========================================
+APP_PATH = os.path.join(ROOT, 'app.py')
+APP_TIMEOUT = 120
+EDIT_TAB = "✏️ 修改 / 刪除紀錄"
+LIVE_PANEL_SPAN = 'ui.live_panel'
+
+NOTES = {
+    'water_click': "AppTest 不會只重跑 fragment：這是點擊後整頁重跑的耗時，比實際使用時高",
+    'water_click_fragment': f"同一批點擊中 {LIVE_PANEL_SPAN} 區段的耗時，即實際點擊時 fragment 重跑的成本 (不含按鈕回呼)；FUXING_PERF=0 時為 null",
+}
+
+
+def seed_database(path, rows, user_id=db.DEFAULT_USER, seed=0):
+    # 合成 rows 天的日誌 (最後一天為昨天)，一個交易 executemany 寫入
+    rng = random.Random(seed)
+    database = db.Database(path)
+    migrations.migrate(database.conn)
+    first_day = datetime.date.today() - datetime.timedelta(days=rows)
+    records = []
+    for i in range(rows):
+        bp_sys, bp_dia = rng.randint(105, 150), rng.randint(65, 95)
+        social = rng.random() < 0.3
+        day = first_day + datetime.timedelta(days=i)
+        # 週末重置只在週六、日勾選
+        weekend = day.weekday() >= 5
+        records.append((
+            user_id, day.isoformat(), 170.0, round(rng.uniform(65, 80), 1),
+            54, rng.randint(60, 70), round(rng.uniform(15, 25), 1), round(rng.uniform(25, 30), 1), round(rng.uniform(28, 34), 1),
+            rng.randint(55, 80), f"{bp_sys}/{bp_dia}", bp_sys, bp_dia, rng.randint(20, 90), social,
+            rng.randint(0, 5), rng.choice([1500, 2000, 2500, 3000]),
+            weekend and rng.random() < 0.5, weekend and rng.random() < 0.5,
+        ))
+    with database.transaction() as conn:
+        conn.executemany(db.SQL_UPSERT_LOG, records)
+        summary.rebuild(conn, user_id)
+    database.close()
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0] * 1000, 2),
+        'median_ms': round(statistics.median(ordered) * 1000, 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+def _timed(action):
+    start = time.perf_counter()
+    at = action()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"app 執行失敗：{at.exception[0].message}")
+    return elapsed
+
+
+def _timed_fragment(action, samples):
+    # 執行 action 並把這段期間 live_panel 區段的耗時加進 samples (perf 關閉時不記錄)
+    seconds_before, calls_before = perf.span_totals(LIVE_PANEL_SPAN)
+    elapsed = _timed(action)
+    seconds_after, calls_after = perf.span_totals(LIVE_PANEL_SPAN)
+    if calls_after > calls_before:
+        samples.append(seconds_after - seconds_before)
+    return elapsed
+
+
+def _button(at, label):
+    return next(b for b in at.button if label in b.label)
+
+
+def _edit_date_input(at):
+    return next(d for d in at.date_input if d.label.startswith("請選擇要修改的日期"))
+
+
+def bench_size(rows, repeats):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        seed_database(path, rows)
+        os.environ[db.DB_PATH_ENV] = path
+
+        # 冷啟動：清空所有 cache_resource (連線、遷移、歷史/趨勢快取) 後第一次執行
+        cold = []
+        for _ in range(repeats):
+            st.cache_resource.clear()
+            cold.append(_timed(lambda: AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT).run()))
+
+        at = AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT).run()
+        water_fragment = []
+        water = [_timed_fragment(lambda: _button(at, "喝一杯水").click().run(), water_fragment) for _ in range(repeats)]
+        save = [_timed(lambda: _button(at, "儲存今日完整日誌").click().run()) for _ in range(repeats)]
+
+        # 編輯分頁：歷史區與分頁都是開啟時才執行，先展開並停在「修改 / 刪除紀錄」，再每次換一個日期讀取不同的那一列
+        at = AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT)
+        at.session_state['history_panel'] = True
+        at.session_state['history_tab'] = EDIT_TAB
+        at.run()
+        rng = random.Random(rows)
+        edit = []
+        for _ in range(repeats):
+            picked = datetime.date.today() - datetime.timedelta(days=rng.randint(1, rows))
+            edit.append(_timed(lambda: _edit_date_input(at).set_value(picked).run()))
+
+        st.cache_resource.clear()
+        return {
+            'rows': rows,
+            'cold_start': _summary(cold),
+            'water_click': _summary(water),
+            'water_click_fragment': _summary(water_fragment) if water_fragment else None,
+            'save': _summary(save),
+            'edit_tab_load': _summary(edit),
+        }
+
+
+def bench_concurrency(rows, sessions, clicks):
+    # sessions 個模擬使用者同時對同一個 SQLite 檔操作：開頁 -> 連續喝水 -> 存檔
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        seed_database(path, rows)
+        os.environ[db.DB_PATH_ENV] = path
+        st.cache_resource.clear()
+
+        latencies, errors = [], []
+        lock = threading.Lock()
+        barrier = threading.Barrier(sessions)
+
+        def session():
+            local = []
+            try:
+                at = AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT)
+                barrier.wait()
+                local.append(_timed(at.run))
+                for _ in range(clicks):
+                    local.append(_timed(lambda: _button(at, "喝一杯水").click().run()))
+                local.append(_timed(lambda: _button(at, "儲存今日完整日誌").click().run()))
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+            with lock:
+                latencies.extend(local)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=session) for _ in range(sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        st.cache_resource.clear()
+        return {
+            'rows': rows,
+            'sessions': sessions,
+            'reruns': len(latencies),
+            'wall_s': round(wall, 3),
+            'reruns_per_s': round(len(latencies) / wall, 2) if wall else None,
+            'latency': _summary(latencies) if latencies else None,
+            'errors': errors,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="復興守護者 無頭效能基準 (輸出 JSON)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="合成歷史紀錄筆數")
+    parser.add_argument('--repeats', type=int, default=5, help="每項量測重複次數")
+    parser.add_argument('--sessions', type=int, default=8, help="同時模擬的 session 數 (0 表示略過)")
+    parser.add_argument('--clicks', type=int, default=5, help="每個模擬 session 的喝水點擊次數")
+    parser.add_argument('--output', help="JSON 輸出檔 (預設印到 stdout)")
+    args = parser.parse_args(argv)
+
+    report = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'streamlit': st.__version__,
+        'notes': NOTES,
+        'sizes': [bench_size(rows, args.repeats) for rows in args.sizes],
+    }
+    if args.sessions:
+        report['concurrency'] = bench_concurrency(args.sizes[-1], args.sessions, args.clicks)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            out.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
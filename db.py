@@ -0,0 +1,256 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import streamlit as st
+
+import migrations
+import perf
+import summary
+
+# ==========================================
+# 🗄️ 資料存取層：單一長連線 + WAL + 預編譯語句
+# ==========================================
+DB_PATH = 'fuxing_guardian_v4.db'
+# 可用環境變數指定其他資料庫 (例如 benchmarks/ 產生的合成資料)
+DB_PATH_ENV = 'FUXING_DB_PATH'
+
+# 每條連線開啟時套用一次的效能參數
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # 讀寫不互鎖，避免 database is locked
+    "PRAGMA synchronous=NORMAL",    # WAL 模式下安全且少一次 fsync
+    "PRAGMA busy_timeout=5000",     # 遇到鎖時等待而不是立刻報錯
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",     # 約 16MB 頁面快取
+)
+
+# 日誌欄位順序 (讀取、寫入共用)
+LOG_COLUMNS = (
+    'date', 'height', 'weight', 'actual_age', 'body_age', 'visceral_fat', 'muscle_mass', 'bmi',
+    'resting_hr', 'blood_pressure', 'bp_systolic', 'bp_diastolic', 'readiness_score', 'social_mode_active', 'micro_workouts_done', 'water_intake_cc',
+    'weekend_fasting', 'weekend_walk',
+)
+
+# 今日面板 (喝水、微運動、應酬模式、週末勾選) 會改動的欄位；自動存檔只覆寫這些，不動編輯頁改過的身體數值
+LIVE_COLUMNS = ('readiness_score', 'social_mode_active', 'micro_workouts_done', 'water_intake_cc', 'weekend_fasting', 'weekend_walk')
+
+# 使用者的基準數值 (profiles 表欄位 -> session_state.metrics 的鍵)
+PROFILE_METRICS = {
+    'height': 'height', 'weight': 'weight', 'actual_age': 'actual_age', 'body_age': 'body_age',
+    'visceral_fat': 'vf', 'muscle_mass': 'muscle', 'bmi': 'bmi', 'resting_hr': 'hr',
+    'bp_systolic': 'bp_sys', 'bp_diastolic': 'bp_dia',
+}
+
+DEFAULT_USER = 'default'
+
+# 💥 SQL 固定為模組常數，讓 sqlite3 的語句快取 (cached_statements) 重複使用已編譯的語句
+# 每個查詢都以 user_id 開頭，走 (user_id, date) 主鍵或 user_id 開頭的索引，不會掃到其他使用者
+SQL_SELECT_PAGE = f"SELECT {', '.join(LOG_COLUMNS)} FROM health_logs WHERE user_id=? AND date BETWEEN ? AND ? ORDER BY date DESC LIMIT ? OFFSET ?"
+SQL_COUNT_RANGE = "SELECT COUNT(*) FROM health_logs WHERE user_id=? AND date BETWEEN ? AND ?"
+SQL_DATE_BOUNDS = "SELECT MIN(date), MAX(date) FROM health_logs WHERE user_id=?"
+SQL_COUNT_HIGH_BP = "SELECT COUNT(*) FROM health_logs WHERE user_id=? AND bp_systolic > ?"
+SQL_SELECT_LOG = "SELECT height, weight, actual_age, body_age, visceral_fat, muscle_mass, bmi, resting_hr, bp_systolic, bp_diastolic, social_mode_active, micro_workouts_done, water_intake_cc, weekend_fasting, weekend_walk, blood_pressure FROM health_logs WHERE user_id=? AND date=?"
+SQL_UPSERT_LOG = f'''
+    INSERT OR REPLACE INTO health_logs (user_id, {', '.join(LOG_COLUMNS)})
+    VALUES (?, {', '.join('?' * len(LOG_COLUMNS))})
+'''
+# 當天還沒有紀錄時插入整列，已有紀錄時只更新 LIVE_COLUMNS
+SQL_UPSERT_LIVE = f'''
+    INSERT INTO health_logs (user_id, {', '.join(LOG_COLUMNS)})
+    VALUES (?, {', '.join('?' * len(LOG_COLUMNS))})
+    ON CONFLICT (user_id, date) DO UPDATE SET {', '.join(f'{col}=excluded.{col}' for col in LIVE_COLUMNS)}
+'''
+SQL_UPDATE_LOG = f'''
+    UPDATE health_logs
+    SET {', '.join(f'{col}=?' for col in LOG_COLUMNS[1:])}
+    WHERE user_id=? AND date=?
+'''
+SQL_DELETE_LOG = "DELETE FROM health_logs WHERE user_id=? AND date=?"
+
+SQL_SELECT_PROFILE = f"SELECT display_name, {', '.join(PROFILE_METRICS)} FROM profiles WHERE user_id=?"
+SQL_INSERT_PROFILE = "INSERT OR IGNORE INTO profiles (user_id, display_name) VALUES (?, ?)"
+SQL_UPDATE_PROFILE_METRICS = f"UPDATE profiles SET {', '.join(f'{col}=?' for col in PROFILE_METRICS)} WHERE user_id=?"
+
+
+# 整個行程共用的一條 SQLite 連線；所有讀寫都經過同一把鎖
+class Database:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        # isolation_level=None：由 transaction() 自行控制 BEGIN/COMMIT
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        for pragma in PRAGMAS:
+            self.conn.execute(pragma)
+        self.lock = threading.RLock()
+        # 每次提交寫入就 +1，讓快取知道資料已變動；
+        # 指定 user_id 的寫入只推進該使用者的計數，其他使用者的快取不受影響
+        self.generation = 0
+        self.user_generations = {}
+
+    def query_one(self, sql, params=()):
+        with self.lock:
+            row = self.conn.execute(sql, params).fetchone()
+        if perf.ENABLED:
+            perf.count_query(row is not None)
+        return row
+
+    def query_all(self, sql, params=()):
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        if perf.ENABLED:
+            perf.count_query(len(rows))
+        return rows
+
+    def read_frame(self, sql, params=()):
+        import pandas as pd
+        with self.lock:
+            df = pd.read_sql_query(sql, self.conn, params=params)
+        if perf.ENABLED:
+            perf.count_query(len(df))
+        return df
+
+    @contextmanager
+    def transaction(self, user_id=None):
+        # BEGIN IMMEDIATE：一開始就拿寫鎖，避免多個 session 同時升級鎖而互相卡死
+        with self.lock:
+            changes_before = self.conn.total_changes
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            if perf.ENABLED:
+                perf.count_query(self.conn.total_changes - changes_before)
+            if user_id is None:
+                self.generation += 1
+            else:
+                self.user_generations[user_id] = self.user_generations.get(user_id, 0) + 1
+
+    # 快取用的資料版本：本行程的寫入看 generation，其他行程 (例如 manage.py) 的寫入看 data_version
+    def data_version(self, user_id=None):
+        with self.lock:
+            return (
+                self.generation, self.user_generations.get(user_id, 0),
+                self.conn.execute("PRAGMA data_version").fetchone()[0],
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+@st.cache_resource
+def _open_db(path):
+    # 每個路徑在每個行程只建立一次，所有 session 與每次 rerun 共用；遷移也只在這裡跑一次
+    db = Database(path)
+    with perf.span('db.migrate'):
+        migrations.migrate(db.conn)
+    return db
+
+
+def get_db():
+    return _open_db(os.environ.get(DB_PATH_ENV, DB_PATH))
+
+
+# ==========================================
+# 👥 使用者
+# ==========================================
+@perf.timed('db.fetch_profile')
+def fetch_profile(db, user_id):
+    # 回傳 (顯示名稱, metrics dict)；找不到使用者時回傳 None
+    row = db.query_one(SQL_SELECT_PROFILE, (user_id,))
+    if row is None:
+        return None
+    return row[0], {key: value for key, value in zip(PROFILE_METRICS.values(), row[1:])}
+
+
+@perf.timed('db.create_profile')
+def create_profile(db, user_id, display_name):
+    with db.transaction(user_id) as conn:
+        conn.execute(SQL_INSERT_PROFILE, (user_id, display_name))
+
+
+@perf.timed('db.update_profile_metrics')
+def update_profile_metrics(db, user_id, metrics):
+    with db.transaction(user_id) as conn:
+        conn.execute(SQL_UPDATE_PROFILE_METRICS, tuple(metrics[key] for key in PROFILE_METRICS.values()) + (user_id,))
+
+
+# ==========================================
+# 📖 日誌讀寫
+# ==========================================
+@perf.timed('db.date_bounds')
+def date_bounds(db, user_id):
+    # 回傳 (最早日期, 最新日期)；沒有任何紀錄時回傳 None
+    first, last = db.query_one(SQL_DATE_BOUNDS, (user_id,))
+    return (first, last) if first else None
+
+
+@perf.timed('db.count_logs')
+def count_logs(db, user_id, start, end):
+    return db.query_one(SQL_COUNT_RANGE, (user_id, start, end))[0]
+
+
+@perf.timed('db.count_high_bp_days')
+def count_high_bp_days(db, user_id, threshold=130):
+    # 走 (user_id, bp_systolic) 索引，不需把血壓字串讀回 Python 解析
+    return db.query_one(SQL_COUNT_HIGH_BP, (user_id, threshold))[0]
+
+
+@perf.timed('db.fetch_log')
+def fetch_log(db, user_id, date):
+    return db.query_one(SQL_SELECT_LOG, (user_id, date))
+
+
+# 寫入明細的同時在同一個交易內增量更新週/月彙總 (先扣掉舊的那一天再加上新的)
+def write_log(conn, user_id, record, live_only=False):
+    # 需在 transaction() 內呼叫 (journal 批次寫入也走這裡)；live_only 時已存在的那一列只更新 LIVE_COLUMNS
+    old = conn.execute(summary.SQL_SELECT_SOURCE, (user_id, record['date'])).fetchone()
+    conn.execute(SQL_UPSERT_LIVE if live_only else SQL_UPSERT_LOG, (user_id,) + tuple(record[col] for col in LOG_COLUMNS))
+    if live_only and old is not None:
+        # 身體數值沿用資料庫裡的值，彙總要用實際寫入後的那一列
+        new = conn.execute(summary.SQL_SELECT_SOURCE, (user_id, record['date'])).fetchone()
+    else:
+        new = tuple(record[col] for col in summary.SOURCE_COLUMNS)
+    summary.apply(conn, user_id, old, new)
+
+
+@perf.timed('db.save_log')
+def save_log(db, user_id, record):
+    with db.transaction(user_id) as conn:
+        write_log(conn, user_id, record)
+
+
+@perf.timed('db.update_log')
+def update_log(db, user_id, date, record):
+    with db.transaction(user_id) as conn:
+        old = conn.execute(summary.SQL_SELECT_SOURCE, (user_id, date)).fetchone()
+        if old is None:
+            return
+        conn.execute(SQL_UPDATE_LOG, tuple(record[col] for col in LOG_COLUMNS[1:]) + (user_id, date))
+        summary.apply(conn, user_id, old, (date,) + tuple(record[col] for col in summary.SOURCE_COLUMNS[1:]))
+
+
+@perf.timed('db.delete_log')
+def delete_log(db, user_id, date):
+    with db.transaction(user_id) as conn:
+        old = conn.execute(summary.SQL_SELECT_SOURCE, (user_id, date)).fetchone()
+        conn.execute(SQL_DELETE_LOG, (user_id, date))
+        summary.apply(conn, user_id, old, None)
+
+
+# ==========================================
+# 🗂️ 週 / 月彙總
+# ==========================================
+@perf.timed('db.fetch_summary')
+def fetch_summary(db, user_id, period):
+    # 回傳 [(period_start, days, ...), ...] (欄位順序見 summary.SUMMARY_COLUMNS)，依期間由舊到新
+    return db.query_all(summary.SQL_SELECT_PERIODS, (user_id, period))
+
+
+@perf.timed('db.rebuild_summary')
+def rebuild_summary(db, user_id=None):
+    with db.transaction(user_id) as conn:
+        return summary.rebuild(conn, user_id)
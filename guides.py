@@ -0,0 +1,35 @@
+import textwrap
+
+import streamlit as st
+
+# ==========================================
+# 🍽️ 會議便當 / 桌菜破解法 (靜態內容)
+# ==========================================
+MEAL_GUIDE_INTRO = "💡 核心邏輯：控制進食順序，避免血糖飆升囤積脂肪。"
+
+MEAL_GUIDES = (
+    ("🍱 台式會議便當", """
+        * **進食順序**：先吃配菜 (蔬菜) ➔ 主菜 (肉類) ➔ 白飯最後。
+        * **防禦策略**：炸排骨/炸雞腿 **務必去皮**；滷肉/控肉避開肥肉。
+        * **減量原則**：白飯最多吃一半，底層吸滿油汁的飯絕對不吃。
+    """),
+    ("🥢 中式桌菜/合菜", """
+        * **進食順序**：先喝清湯 ➔ 蔬菜 ➔ 海鮮/瘦肉 ➔ 澱粉最後。
+        * **防禦策略**：**絕對避開勾芡** (如羹湯、糖醋、佛跳牆)，這些是隱形糖油炸彈。
+        * **飲品控制**：果汁與含糖飲料是地雷，請全程替換為無糖茶或溫水。
+    """),
+    ("🍔 西式餐飲", """
+        * **防禦策略**：漢堡麵包只吃一半 (或只吃下半層)；披薩餅皮邊緣少吃。
+        * **配餐替換**：薯條換成生菜沙拉 (醬汁減半或不加) 或無糖飲料。
+    """),
+    ("🍣 日式料理", """
+        * **隱形陷阱**：壽司的「醋飯」含有大量糖分，建議優先選擇生魚片 (刺身) 或烤魚。
+        * **防禦策略**：先吃毛豆、茶碗蒸墊胃，減緩血糖上升速度。
+    """),
+)
+
+
+@st.cache_resource
+def meal_guides():
+    # 整理好的 (分頁標題, markdown) 每個行程只做一次，所有 session 共用
+    return tuple((label, textwrap.dedent(body).strip()) for label, body in MEAL_GUIDES)
@@ -0,0 +1,64 @@
+import streamlit as st
+
+import db
+import perf
+
+# ==========================================
+# 📖 歷史紀錄快取：只有資料真的被寫入後才重新讀取，且一次只讀一頁
+# ==========================================
+PAGE_SIZES = [30, 100, 365]
+
+# 顯示用欄位標題 (交給 st.dataframe 的 column_config，不必複製 DataFrame 來改名)；None 代表隱藏 (血壓已合併顯示)
+COLUMN_LABELS = {
+    'date': '日期', 'height': '身高(cm)', 'weight': '體重(kg)', 'actual_age': '實際年齡', 'body_age': '身體年齡',
+    'visceral_fat': '內臟脂肪', 'muscle_mass': '骨骼肌(%)', 'bmi': 'BMI', 'resting_hr': '安靜心率',
+    'blood_pressure': '血壓(mmHg)', 'bp_systolic': None, 'bp_diastolic': None, 'readiness_score': '綜合評分', 'social_mode_active': '有應酬?',
+    'micro_workouts_done': '微訓練(次)', 'water_intake_cc': '喝水量(cc)', 'weekend_fasting': '週末微斷食', 'weekend_walk': '週末漫步',
+}
+
+
+# cache_resource 直接回傳同一個物件 (cache_data 每次命中都會反序列化出一份副本)，呼叫端請勿就地修改
+# 快取鍵都包含 user_id 與該使用者的資料版本，其他使用者存檔不會讓這裡失效
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _history_page(_database, user_id, version, start, end, page_size, page):
+    return _database.read_frame(db.SQL_SELECT_PAGE, (user_id, start, end, page_size, page * page_size))
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _count(_database, user_id, version, start, end):
+    return db.count_logs(_database, user_id, start, end)
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _bounds(_database, user_id, version):
+    return db.date_bounds(_database, user_id)
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _high_bp(_database, user_id, version, threshold):
+    return db.count_high_bp_days(_database, user_id, threshold)
+
+
+@perf.timed('history.count_high_bp_days')
+def count_high_bp_days(user_id, threshold=130):
+    database = db.get_db()
+    return _high_bp(database, user_id, database.data_version(user_id), threshold)
+
+
+@perf.timed('history.date_bounds')
+def date_bounds(user_id):
+    database = db.get_db()
+    return _bounds(database, user_id, database.data_version(user_id))
+
+
+@perf.timed('history.count_logs')
+def count_logs(user_id, start, end):
+    database = db.get_db()
+    return _count(database, user_id, database.data_version(user_id), start, end)
+
+
+# page 從 0 開始；每次只讀一頁，頁面大小不隨紀錄總數增加
+@perf.timed('history.load_page')
+def load_page(user_id, start, end, page_size, page):
+    database = db.get_db()
+    return _history_page(database, user_id, database.data_version(user_id), start, end, page_size, page)
@@ -0,0 +1,106 @@
+import atexit
+import logging
+import os
+import threading
+
+import streamlit as st
+
+import db
+import perf
+
+# ==========================================
+# 📝 寫入延後的自動存檔日誌 (write-behind)
+# ==========================================
+# 按鈕只把今日狀態快照放進記憶體佇列 (同一使用者同一天只留最新一份)，
+# 由背景執行緒每隔 FLUSH_INTERVAL 秒批次寫入 health_logs 當天那一列；
+# 一般點擊只覆寫今日面板的欄位 (db.LIVE_COLUMNS)，更新數值與儲存按鈕才寫入整列，
+# 點擊本身不等資料庫；行程結束時 (atexit) 會把尚未寫入的快照全部寫完。
+FLUSH_INTERVAL = 1.0
+
+logger = logging.getLogger('fuxing_guardian.journal')
+
+
+class Journal:
+    def __init__(self, database, interval=FLUSH_INTERVAL):
+        self.database = database
+        self.interval = interval
+        self.pending = {}       # (user_id, date) -> (最新的完整紀錄 dict, 是否寫入整列)
+        self.lock = threading.Lock()
+        # 一次只允許一個 flush，較舊的快照不會在較新的之後才提交
+        self.flush_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='fuxing-journal', daemon=True)
+        self.thread.start()
+
+    def record(self, user_id, date, record, full=False):
+        # 前一份尚未寫入的快照要寫整列時，合併後仍寫整列
+        with self.lock:
+            previous = self.pending.get((user_id, date))
+            self.pending[(user_id, date)] = (record, full or (previous is not None and previous[1]))
+
+    def discard(self, user_id, date):
+        # 直接修改/刪除某天紀錄前呼叫：等進行中的 flush 結束，並丟掉該天尚未寫入的快照，舊快照才不會蓋回去
+        with self.flush_lock, self.lock:
+            self.pending.pop((user_id, date), None)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                # 背景執行緒不能因此結束，否則本行程之後的自動存檔都不會再寫入
+                logger.exception("自動存檔背景寫入失敗")
+
+    def flush(self):
+        # 回傳寫入失敗的 (user_id, date) 清單；失敗的快照放回佇列 (除非期間已有更新的快照)，下一輪再試
+        with self.flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if not batch:
+            return []
+        by_user = {}
+        for (user_id, date), entry in batch.items():
+            by_user.setdefault(user_id, []).append(entry)
+        failed = []
+        with perf.span('journal.flush'):
+            for user_id, records in by_user.items():
+                try:
+                    with self.database.transaction(user_id) as conn:
+                        for record, full in records:
+                            db.write_log(conn, user_id, record, live_only=not full)
+                except Exception:
+                    # 不只資料庫錯誤：任何例外都要把這批快照放回佇列，不能丟掉
+                    logger.exception("自動存檔寫入失敗，稍後重試 (user_id=%s)", user_id)
+                    with self.lock:
+                        for key, entry in batch.items():
+                            if key[0] == user_id:
+                                previous = self.pending.get(key)
+                                if previous is None:
+                                    self.pending[key] = entry
+                                elif entry[1] and not previous[1]:
+                                    # 較新的快照只寫今日欄位，但失敗的那份要寫整列：合併成寫整列
+                                    self.pending[key] = (previous[0], True)
+                                failed.append(key)
+        return failed
+
+    def close(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.flush()
+
+
+@st.cache_resource(on_release=Journal.close)
+def _open_journal(path):
+    # 每個資料庫在每個行程只有一個日誌與一條背景執行緒，所有 session 共用
+    journal = Journal(db._open_db(path))
+    atexit.register(journal.close)
+    return journal
+
+
+def get_journal():
+    return _open_journal(os.environ.get(db.DB_PATH_ENV, db.DB_PATH))
@@ -0,0 +1,106 @@
+import argparse
+import os
+
+import db
+import migrations
+import readiness
+import transfer
+
+# ==========================================
+# 🧰 維運指令 (不需啟動 Streamlit)
+#   python manage.py migrate [--db 路徑]
+#   python manage.py recompute [--user 使用者] [--db 路徑]
+#   python manage.py rebuild-summary [--user 使用者] [--db 路徑]
+#   python manage.py import 檔案.csv|檔案.parquet [--user 使用者] [--db 路徑]
+#   python manage.py export 檔案.csv|檔案.parquet [--user 使用者] [--start 日期] [--end 日期] [--db 路徑]
+# ==========================================
+def cmd_migrate(args):
+    database = db.Database(args.db)
+    try:
+        applied = migrations.migrate(database.conn)
+        print(f"✅ {args.db}：執行 {applied} 個遷移，目前版本 {migrations.schema_version(database.conn)}")
+    finally:
+        database.close()
+
+
+def cmd_recompute(args):
+    database = db.Database(args.db)
+    try:
+        migrations.migrate(database.conn)
+        updated = readiness.recompute_all_scores(database, args.user)
+        print(f"✅ {args.db}：以目前公式重算評分，更新 {updated} 筆")
+    finally:
+        database.close()
+
+
+def cmd_rebuild_summary(args):
+    database = db.Database(args.db)
+    try:
+        migrations.migrate(database.conn)
+        rebuilt = db.rebuild_summary(database, args.user)
+        print(f"✅ {args.db}：依明細重建週/月彙總，共 {rebuilt} 列")
+    finally:
+        database.close()
+
+
+def cmd_import(args):
+    database = db.Database(args.db)
+    try:
+        migrations.migrate(database.conn)
+        imported = transfer.import_file(database, args.file, args.format, args.chunk_rows, args.user)
+        print(f"✅ {args.file}：匯入 {imported} 筆")
+    finally:
+        database.close()
+
+
+def cmd_export(args):
+    database = db.Database(args.db)
+    try:
+        migrations.migrate(database.conn)
+        if (args.format or transfer.detect_format(args.file)) == 'parquet':
+            exported = transfer.export_parquet(database, args.file, args.user, args.start, args.end)
+        else:
+            with open(args.file, 'w', newline='', encoding=transfer.CSV_ENCODING) as dest:
+                exported = transfer.export_csv(database, dest, args.user, args.start, args.end)
+        print(f"✅ {args.file}：匯出 {exported} 筆")
+    finally:
+        database.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="復興守護者 資料庫維運工具")
+    parser.add_argument('--db', default=os.environ.get(db.DB_PATH_ENV, db.DB_PATH), help="SQLite 資料庫路徑")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('migrate', help="把資料庫升級到最新版本").set_defaults(func=cmd_migrate)
+    recompute_parser = sub.add_parser('recompute', help="以目前公式重算歷史評分")
+    recompute_parser.add_argument('--user', help="只重算這位使用者 (預設全部)")
+    recompute_parser.set_defaults(func=cmd_recompute)
+    rebuild_parser = sub.add_parser('rebuild-summary', help="依明細重建週/月彙總表 (修復用)")
+    rebuild_parser.add_argument('--user', help="只重建這位使用者 (預設全部)")
+    rebuild_parser.set_defaults(func=cmd_rebuild_summary)
+
+    import_parser = sub.add_parser('import', help="批次匯入 CSV / Parquet (同日期的紀錄會被覆蓋)")
+    import_parser.add_argument('file')
+    import_parser.add_argument('--format', choices=['csv', 'parquet'], help="預設依副檔名判斷")
+    import_parser.add_argument('--chunk-rows', type=int, default=transfer.CHUNK_ROWS, help="每個交易處理的列數")
+    import_parser.add_argument('--user', default=db.DEFAULT_USER, help="檔案沒有 user_id 欄位時歸屬的使用者")
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = sub.add_parser('export', help="匯出整張表或某段日期")
+    export_parser.add_argument('file')
+    export_parser.add_argument('--format', choices=['csv', 'parquet'], help="預設依副檔名判斷")
+    export_parser.add_argument('--user', help="只匯出這位使用者 (預設全部)")
+    export_parser.add_argument('--start', help="起始日期 YYYY-MM-DD (含)")
+    export_parser.add_argument('--end', help="結束日期 YYYY-MM-DD (含)")
+    export_parser.set_defaults(func=cmd_export)
+
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except (ValueError, RuntimeError) as exc:
+        parser.exit(1, f"❌ {exc}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+# 血壓字串嚴格符合「整數/整數」(前後可有空白) 才回填數值欄位，與 readiness.parse_blood_pressure 的判斷一致；
+# 兩半各自轉整數再轉回字串必須與原文相同，因此 '12a/8b0'、'120/80/70'、'120/' 都會被排除
+_SYSTOLIC_TEXT = "trim(substr(blood_pressure, 1, instr(blood_pressure, '/') - 1))"
+_DIASTOLIC_TEXT = "trim(substr(blood_pressure, instr(blood_pressure, '/') + 1))"
+STRICT_BLOOD_PRESSURE = (
+    f"CAST({_SYSTOLIC_TEXT} AS INTEGER) || '' = {_SYSTOLIC_TEXT} "
+    f"AND CAST({_DIASTOLIC_TEXT} AS INTEGER) || '' = {_DIASTOLIC_TEXT}"
+)
+
+# ==========================================
+# 🧬 資料表版本遷移 (PRAGMA user_version)
+# ==========================================
+# 每個遷移只會執行一次：資料庫記錄目前版本號，啟動時只補跑比它新的步驟。
+# 新增欄位/索引時，請在 MIGRATIONS 最後面追加一個函式，不要修改已發佈的步驟。
+
+
+def _create_health_logs(conn):
+    # 1. 確保基礎表存在 (舊版結構)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS health_logs (
+            date TEXT PRIMARY KEY,
+            actual_age INTEGER,
+            body_age INTEGER,
+            visceral_fat REAL,
+            muscle_mass REAL,
+            bmi REAL,
+            resting_hr INTEGER,
+            blood_pressure TEXT,
+            readiness_score INTEGER,
+            social_mode_active BOOLEAN,
+            micro_workouts_done INTEGER,
+            water_intake_cc INTEGER
+        )
+    ''')
+
+
+def _add_height_weight(conn):
+    # 2. 舊資料庫可能已被先前的 PRAGMA 掃描擴充過，所以仍需檢查欄位是否存在
+    columns = table_columns(conn, 'health_logs')
+    if 'height' not in columns:
+        conn.execute("ALTER TABLE health_logs ADD COLUMN height REAL DEFAULT 170.0")
+    if 'weight' not in columns:
+        conn.execute("ALTER TABLE health_logs ADD COLUMN weight REAL DEFAULT 70.0")
+
+
+def _add_numeric_blood_pressure(conn):
+    # 3. 血壓拆成兩個整數欄位並一次回填，趨勢/門檻查詢可以直接在 SQL 端篩選
+    columns = table_columns(conn, 'health_logs')
+    if 'bp_systolic' not in columns:
+        conn.execute("ALTER TABLE health_logs ADD COLUMN bp_systolic INTEGER")
+    if 'bp_diastolic' not in columns:
+        conn.execute("ALTER TABLE health_logs ADD COLUMN bp_diastolic INTEGER")
+    conn.execute(f'''
+        UPDATE health_logs SET
+            bp_systolic = CAST({_SYSTOLIC_TEXT} AS INTEGER),
+            bp_diastolic = CAST({_DIASTOLIC_TEXT} AS INTEGER)
+        WHERE {STRICT_BLOOD_PRESSURE}
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_health_logs_bp_systolic ON health_logs (bp_systolic)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_health_logs_social ON health_logs (social_mode_active, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_health_logs_readiness ON health_logs (readiness_score)")
+
+
+def _partition_by_user(conn):
+    # 4. 多使用者：主鍵改為 (user_id, date)，既有紀錄歸到 default 使用者
+    #    SQLite 不能修改主鍵，只能建新表、搬資料、換名；舊索引隨舊表一起刪除
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS profiles (
+            user_id TEXT PRIMARY KEY,
+            display_name TEXT NOT NULL,
+            height REAL DEFAULT 170.0,
+            weight REAL DEFAULT 70.0,
+            actual_age INTEGER DEFAULT 50,
+            body_age INTEGER DEFAULT 50,
+            visceral_fat REAL DEFAULT 10.0,
+            muscle_mass REAL DEFAULT 30.0,
+            bmi REAL DEFAULT 24.0,
+            resting_hr INTEGER DEFAULT 65,
+            bp_systolic INTEGER DEFAULT 120,
+            bp_diastolic INTEGER DEFAULT 80
+        )
+    ''')
+    # 原本寫死在程式裡的預設數值，改存成 default 使用者的基準值
+    conn.execute('''
+        INSERT OR IGNORE INTO profiles
+        (user_id, display_name, height, weight, actual_age, body_age, visceral_fat, muscle_mass, bmi, resting_hr, bp_systolic, bp_diastolic)
+        VALUES ('default', '蘇區長', 170.0, 70.0, 54, 69, 25.0, 26.7, 33.8, 63, 119, 79)
+    ''')
+
+    conn.execute('''
+        CREATE TABLE health_logs_by_user (
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            height REAL DEFAULT 170.0,
+            weight REAL DEFAULT 70.0,
+            actual_age INTEGER,
+            body_age INTEGER,
+            visceral_fat REAL,
+            muscle_mass REAL,
+            bmi REAL,
+            resting_hr INTEGER,
+            blood_pressure TEXT,
+            bp_systolic INTEGER,
+            bp_diastolic INTEGER,
+            readiness_score INTEGER,
+            social_mode_active BOOLEAN,
+            micro_workouts_done INTEGER,
+            water_intake_cc INTEGER,
+            PRIMARY KEY (user_id, date)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO health_logs_by_user
+        (user_id, date, height, weight, actual_age, body_age, visceral_fat, muscle_mass, bmi, resting_hr,
+         blood_pressure, bp_systolic, bp_diastolic, readiness_score, social_mode_active, micro_workouts_done, water_intake_cc)
+        SELECT 'default', date, height, weight, actual_age, body_age, visceral_fat, muscle_mass, bmi, resting_hr,
+               blood_pressure, bp_systolic, bp_diastolic, readiness_score, social_mode_active, micro_workouts_done, water_intake_cc
+        FROM health_logs
+    ''')
+    conn.execute("DROP TABLE health_logs")
+    conn.execute("ALTER TABLE health_logs_by_user RENAME TO health_logs")
+
+    # 所有索引都以 user_id 開頭，單一使用者的查詢只會掃到自己的資料
+    conn.execute("CREATE INDEX idx_health_logs_bp_systolic ON health_logs (user_id, bp_systolic)")
+    conn.execute("CREATE INDEX idx_health_logs_social ON health_logs (user_id, social_mode_active, date)")
+    conn.execute("CREATE INDEX idx_health_logs_readiness ON health_logs (user_id, readiness_score)")
+
+
+def _add_weekend_reset_and_summary(conn):
+    # 5. 週末重置勾選結果存進日誌；新增週/月彙總表並從既有明細建好
+    columns = table_columns(conn, 'health_logs')
+    if 'weekend_fasting' not in columns:
+        conn.execute("ALTER TABLE health_logs ADD COLUMN weekend_fasting BOOLEAN DEFAULT 0")
+    if 'weekend_walk' not in columns:
+        conn.execute("ALTER TABLE health_logs ADD COLUMN weekend_walk BOOLEAN DEFAULT 0")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS log_summary (
+            user_id TEXT NOT NULL,
+            period TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            days INTEGER NOT NULL DEFAULT 0,
+            visceral_fat_sum REAL NOT NULL DEFAULT 0,
+            visceral_fat_days INTEGER NOT NULL DEFAULT 0,
+            weight_sum REAL NOT NULL DEFAULT 0,
+            weight_days INTEGER NOT NULL DEFAULT 0,
+            body_age_sum REAL NOT NULL DEFAULT 0,
+            body_age_days INTEGER NOT NULL DEFAULT 0,
+            resting_hr_sum REAL NOT NULL DEFAULT 0,
+            resting_hr_days INTEGER NOT NULL DEFAULT 0,
+            social_days INTEGER NOT NULL DEFAULT 0,
+            water_goal_days INTEGER NOT NULL DEFAULT 0,
+            weekend_days INTEGER NOT NULL DEFAULT 0,
+            weekend_fasting_days INTEGER NOT NULL DEFAULT 0,
+            weekend_walk_days INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, period, period_start)
+        ) WITHOUT ROWID
+    ''')
+    # 從既有明細建好彙總；SQL 是這一步發佈當下 summary.rebuild() 規則的固定副本，
+    # 之後 summary 模組增減欄位也不影響這一步 (新欄位請在後面的步驟自行回填)
+    conn.execute("DELETE FROM log_summary")
+    for period, period_start in (
+        ('week', "date(date, '-' || ((CAST(strftime('%w', date) AS INTEGER) + 6) % 7) || ' days')"),
+        ('month', "strftime('%Y-%m-01', date)"),
+    ):
+        conn.execute(f'''
+            INSERT INTO log_summary (
+                user_id, period, period_start, days,
+                visceral_fat_sum, visceral_fat_days, weight_sum, weight_days,
+                body_age_sum, body_age_days, resting_hr_sum, resting_hr_days,
+                social_days, water_goal_days, weekend_days, weekend_fasting_days, weekend_walk_days
+            )
+            SELECT user_id, '{period}', {period_start} AS period_start, COUNT(*),
+                TOTAL(visceral_fat), COUNT(visceral_fat), TOTAL(weight), COUNT(weight),
+                TOTAL(body_age), COUNT(body_age), TOTAL(resting_hr), COUNT(resting_hr),
+                SUM(CASE WHEN social_mode_active THEN 1 ELSE 0 END),
+                SUM(CASE WHEN COALESCE(water_intake_cc, 0) >= CASE WHEN social_mode_active THEN 3000 ELSE 2000 END THEN 1 ELSE 0 END),
+                SUM(CASE WHEN strftime('%w', date) IN ('0', '6') THEN 1 ELSE 0 END),
+                SUM(CASE WHEN strftime('%w', date) IN ('0', '6') AND weekend_fasting THEN 1 ELSE 0 END),
+                SUM(CASE WHEN strftime('%w', date) IN ('0', '6') AND weekend_walk THEN 1 ELSE 0 END)
+            FROM health_logs
+            GROUP BY user_id, period_start
+        ''')
+
+
+# 索引 i 的函式會把資料庫從版本 i 升級到 i + 1
+MIGRATIONS = (
+    _create_health_logs,
+    _add_height_weight,
+    _add_numeric_blood_pressure,
+    _partition_by_user,
+    _add_weekend_reset_and_summary,
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def table_columns(conn, table):
+    return [info[1] for info in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+# 把資料庫升級到 SCHEMA_VERSION，回傳實際執行的遷移數量。
+# conn 需為 isolation_level=None 的連線；每一步與其版本號在同一個交易中提交。
+def migrate(conn):
+    applied = 0
+    while True:
+        # 先拿寫鎖再讀版本，避免多個行程同時啟動時重複執行同一步
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            if version >= SCHEMA_VERSION:
+                conn.execute("COMMIT")
+                return applied
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        applied += 1
@@ -0,0 +1,213 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# ==========================================
+# ⏱️ 熱路徑量測 (預設關閉)
+#   FUXING_PERF=1 streamlit run app.py
+# ==========================================
+# 關閉時：span() 回傳共用的空 context manager，timed() 直接回傳原函式，幾乎沒有額外成本。
+# 開啟時：每次 rerun 記錄各區段耗時、查詢數與列數，側邊欄顯示上一次 rerun 的明細，
+#         並累積成整個行程的直方圖 (可匯出 Prometheus 文字格式)，每次 rerun 也寫一行 JSON log 到 stderr。
+ENABLED = os.environ.get('FUXING_PERF') == '1'
+
+
+def _stderr_logger(name):
+    # Streamlit 只設定自己的 streamlit.* logger；這裡自己掛 handler，JSON log 才會真的輸出
+    log = logging.getLogger(name)
+    if not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    return log
+
+
+logger = _stderr_logger('fuxing_guardian.perf') if ENABLED else logging.getLogger('fuxing_guardian.perf')
+# 冷啟動量測不受 FUXING_PERF 影響，每個行程一律輸出一行，自動擴展的新實例也看得到
+startup_logger = _stderr_logger('fuxing_guardian.startup')
+
+# 直方圖分桶上限 (秒)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_NOOP = nullcontext()
+_local = threading.local()
+
+# 行程層級的累計資料：span 名稱 -> [各分桶計數..., +Inf 計數], 總秒數, 次數
+_registry_lock = threading.Lock()
+_histograms = {}
+_counters = {'reruns': 0, 'queries': 0, 'rows': 0}
+
+
+class _Recorder:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = {}     # 名稱 -> [累計秒數, 次數]
+        self.queries = 0
+        self.rows = 0
+
+
+def _observe(name, seconds):
+    with _registry_lock:
+        entry = _histograms.get(name)
+        if entry is None:
+            entry = _histograms[name] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        entry[1] += seconds
+        entry[2] += 1
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        recorder = getattr(_local, 'recorder', None)
+        if recorder is not None:
+            totals = recorder.spans.setdefault(name, [0.0, 0])
+            totals[0] += elapsed
+            totals[1] += 1
+        _observe(name, elapsed)
+
+
+def span(name):
+    return _span(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    # 裝飾器；關閉時不包裝，呼叫路徑與原本完全相同
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count_query(rows):
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is not None:
+        recorder.queries += 1
+        recorder.rows += rows
+    with _registry_lock:
+        _counters['queries'] += 1
+        _counters['rows'] += rows
+
+
+# ------------------------------------------
+# 🔁 每次 rerun 的起訖
+# ------------------------------------------
+def begin_rerun(name='app'):
+    # 在腳本最上方呼叫；st.rerun() 中斷的上一輪若沒走到 end_rerun，直接丟棄重新起算
+    if ENABLED:
+        _local.recorder = _Recorder(name)
+
+
+def end_rerun():
+    # 回傳這次 rerun 的摘要 dict；未開啟或沒有進行中的 rerun 時回傳 None
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is None:
+        return None
+    _local.recorder = None
+    total = time.perf_counter() - recorder.started
+    _observe(f"rerun.{recorder.name}", total)
+    with _registry_lock:
+        _counters['reruns'] += 1
+    summary = {
+        'rerun': recorder.name,
+        'total_ms': round(total * 1000, 2),
+        'queries': recorder.queries,
+        'rows': recorder.rows,
+        'spans': {name: {'ms': round(sec * 1000, 2), 'calls': calls} for name, (sec, calls) in recorder.spans.items()},
+    }
+    logger.info(json.dumps(summary, ensure_ascii=False))
+    return summary
+
+
+def fragment_scope(name):
+    # 放在 @st.fragment 之下：fragment 單獨重跑時自成一次 rerun；整頁執行時只當作一般 span
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # 整頁執行時已有進行中的 rerun，不另外起算
+            owns = getattr(_local, 'recorder', None) is None
+            if owns:
+                begin_rerun(name)
+            try:
+                with _span(f"ui.{name}"):
+                    return func(*args, **kwargs)
+            finally:
+                if owns:
+                    end_rerun()
+        return wrapper
+    return decorate
+
+
+# ------------------------------------------
+# 🚀 冷啟動 (不受 FUXING_PERF 影響，每個行程只記錄一次)
+# ------------------------------------------
+startup = None
+
+
+def record_startup(import_seconds, total_seconds):
+    # 在第一次 rerun 結尾呼叫：import 耗時與 import + 首次渲染的總耗時；之後的呼叫直接忽略
+    global startup
+    with _registry_lock:
+        if startup is not None:
+            return False
+        startup = {'import_ms': round(import_seconds * 1000, 2), 'first_render_ms': round(total_seconds * 1000, 2)}
+    startup_logger.info(json.dumps({'startup': startup}))
+    return True
+
+
+# ------------------------------------------
+# 📤 匯出
+# ------------------------------------------
+def span_totals(name):
+    # 本行程累計的 (總秒數, 次數)；benchmarks/ 用前後相減取得某段操作內該區段的耗時
+    with _registry_lock:
+        entry = _histograms.get(name)
+        return (entry[1], entry[2]) if entry else (0.0, 0)
+
+
+def prometheus_text():
+    lines = [
+        '# HELP fuxing_span_seconds Time spent in instrumented spans.',
+        '# TYPE fuxing_span_seconds histogram',
+    ]
+    with _registry_lock:
+        histograms = {name: (list(buckets), total, count) for name, (buckets, total, count) in _histograms.items()}
+        counters = dict(_counters)
+    for name in sorted(histograms):
+        buckets, total, count = histograms[name]
+        cumulative = 0
+        for bound, hits in zip(BUCKETS + (float('inf'),), buckets):
+            cumulative += hits
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'fuxing_span_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'fuxing_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f'fuxing_span_seconds_count{{span="{name}"}} {count}')
+    if startup is not None:
+        lines.append('# TYPE fuxing_startup_seconds gauge')
+        lines.append(f'fuxing_startup_seconds{{phase="import"}} {startup["import_ms"] / 1000:.6f}')
+        lines.append(f'fuxing_startup_seconds{{phase="first_render"}} {startup["first_render_ms"] / 1000:.6f}')
+    for key in ('reruns', 'queries', 'rows'):
+        lines.append(f'# TYPE fuxing_{key}_total counter')
+        lines.append(f'fuxing_{key}_total {counters[key]}')
+    return '\n'.join(lines) + '\n'
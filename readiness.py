@@ -0,0 +1,102 @@
+import perf
+
+# ==========================================
+# 🧮 代謝綜合評分：單筆 (即時儀表板) 與批次 (歷史重算) 共用同一套公式
+# ==========================================
+# numpy/pandas 只在批次函式內才載入，即時儀表板的單筆評分不需要，冷啟動不用付這筆 import 成本
+SOCIAL_WATER_GOAL = 3000
+NORMAL_WATER_GOAL = 2000
+
+
+def calculate_readiness(vf, hr, bp_sys, body_age, actual_age, social_mode, micro_workouts, water_intake, water_goal):
+    base_score = 100
+    if vf > 10: base_score -= (vf - 10) * 1.5 
+    if hr > 65: base_score -= (hr - 65) * 2
+    if bp_sys > 130: base_score -= (bp_sys - 130) * 1 
+    
+    age_gap = body_age - actual_age
+    if age_gap > 0:
+        base_score -= age_gap * 1
+        
+    if social_mode: base_score -= 20
+    
+    base_score += (micro_workouts * 3)
+    if water_intake >= water_goal:
+        base_score += 5 
+        
+    return max(0, min(100, int(base_score)))
+
+
+# 向量化版本：每一項扣分/加分的順序與 calculate_readiness 完全相同，結果逐筆一致。
+# water_goal 省略時依 social_mode 逐列套用 3000/2000。
+def calculate_readiness_batch(vf, hr, bp_sys, body_age, actual_age, social_mode, micro_workouts, water_intake, water_goal=None):
+    import numpy as np
+    vf = np.asarray(vf, dtype=float)
+    hr = np.asarray(hr, dtype=float)
+    bp_sys = np.asarray(bp_sys, dtype=float)
+    age_gap = np.asarray(body_age, dtype=float) - np.asarray(actual_age, dtype=float)
+    social_mode = np.asarray(social_mode, dtype=bool)
+    micro_workouts = np.asarray(micro_workouts, dtype=float)
+    water_intake = np.asarray(water_intake, dtype=float)
+    if water_goal is None:
+        water_goal = np.where(social_mode, SOCIAL_WATER_GOAL, NORMAL_WATER_GOAL)
+
+    base_score = np.full(np.broadcast(vf, hr, bp_sys, age_gap, social_mode).shape, 100.0)
+    base_score -= np.where(vf > 10, (vf - 10) * 1.5, 0)
+    base_score -= np.where(hr > 65, (hr - 65) * 2, 0)
+    base_score -= np.where(bp_sys > 130, (bp_sys - 130) * 1, 0)
+    base_score -= np.where(age_gap > 0, age_gap * 1, 0)
+    base_score -= np.where(social_mode, 20, 0)
+    base_score += micro_workouts * 3
+    base_score += np.where(water_intake >= water_goal, 5, 0)
+
+    # int() 是向零截斷，對應 np.trunc
+    return np.clip(np.trunc(base_score), 0, 100).astype(int)
+
+
+# 「整數/整數」，前後與斜線兩側可有空白；不允許小數、前導 0、多餘的斜線或其他字元
+BLOOD_PRESSURE_PATTERN = r' *(-?[1-9][0-9]*|0) */ *(-?[1-9][0-9]*|0) *'
+
+
+def parse_blood_pressure(values):
+    # "收縮壓/舒張壓" 字串 -> 兩個浮點陣列；格式不符的列為 NaN (不會被扣分)，
+    # 規則與 migrations.STRICT_BLOOD_PRESSURE 相同
+    import pandas as pd
+    parts = pd.Series(values, dtype=object).astype(str).str.extract(f'^{BLOOD_PRESSURE_PATTERN}$')
+    return (
+        pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype=float),
+        pd.to_numeric(parts[1], errors='coerce').to_numpy(dtype=float),
+    )
+
+
+# DataFrame 版本：欄位名稱與 health_logs 相同，bp_systolic 缺少時從 blood_pressure 解析
+def readiness_for_frame(df):
+    import pandas as pd
+    bp_sys = df['bp_systolic'] if 'bp_systolic' in df else parse_blood_pressure(df['blood_pressure'])[0]
+    social = pd.to_numeric(df['social_mode_active'], errors='coerce').fillna(0).to_numpy() != 0
+    return calculate_readiness_batch(
+        df['visceral_fat'], df['resting_hr'], bp_sys, df['body_age'], df['actual_age'],
+        social, df['micro_workouts_done'].fillna(0), df['water_intake_cc'].fillna(0),
+    )
+
+
+SQL_SELECT_SCORING = "SELECT user_id, date, visceral_fat, resting_hr, bp_systolic, body_age, actual_age, social_mode_active, micro_workouts_done, water_intake_cc, readiness_score FROM health_logs"
+SQL_UPDATE_SCORE = "UPDATE health_logs SET readiness_score=? WHERE user_id=? AND date=?"
+
+
+# 以目前公式重算歷史評分 (user_id 為 None 時重算所有使用者)；
+# 只寫回有變動的列，全部在同一個交易內 executemany，回傳更新筆數
+@perf.timed('readiness.recompute_all_scores')
+def recompute_all_scores(database, user_id=None):
+    import pandas as pd
+    sql, params = (SQL_SELECT_SCORING, ()) if user_id is None else (SQL_SELECT_SCORING + " WHERE user_id=?", (user_id,))
+    df = database.read_frame(sql, params)
+    if df.empty:
+        return 0
+    scores = readiness_for_frame(df)
+    changed = pd.to_numeric(df['readiness_score'], errors='coerce').to_numpy() != scores
+    with database.transaction(user_id) as conn:
+        conn.executemany(SQL_UPDATE_SCORE, zip(
+            scores[changed].tolist(), df['user_id'][changed].tolist(), df['date'][changed].tolist()
+        ))
+    return int(changed.sum())
@@ -0,0 +1,136 @@
+import datetime
+
+import streamlit as st
+
+import db
+import journal
+import perf
+
+from readiness import NORMAL_WATER_GOAL, SOCIAL_WATER_GOAL, calculate_readiness
+
+# ==========================================
+# 🧠 今日狀態轉移：所有按鈕只改原始狀態，評分一律由 recompute() 推導
+# ==========================================
+# 這些函式可直接當作 on_click 回呼使用：回呼會在重跑之前執行，
+# 放在 st.fragment 內時只會重跑該區塊，不需要再呼叫 st.rerun()。
+# 每次狀態改變都把今日快照交給 journal 延後寫入，重新連線或伺服器重啟後可從資料庫還原。
+# 點擊只更新今日面板的欄位；編輯頁直接改過的身體數值不會被自動存檔蓋回去。
+
+
+def water_goal():
+    return SOCIAL_WATER_GOAL if st.session_state.social_mode else NORMAL_WATER_GOAL
+
+
+@perf.timed('state.recompute')
+def recompute():
+    metrics = st.session_state.metrics
+    st.session_state.readiness_score = calculate_readiness(
+        metrics['vf'], metrics['hr'], metrics['bp_sys'], metrics['body_age'], metrics['actual_age'],
+        st.session_state.social_mode, st.session_state.micro_workouts, st.session_state.water_intake, water_goal()
+    )
+
+
+def today_record():
+    # 目前狀態對應的 health_logs 整列 (儲存按鈕與自動存檔共用)
+    metrics = st.session_state.metrics
+    return {
+        'date': st.session_state.log_date, 'height': metrics['height'], 'weight': metrics['weight'],
+        'actual_age': metrics['actual_age'], 'body_age': metrics['body_age'],
+        'visceral_fat': metrics['vf'], 'muscle_mass': metrics['muscle'],
+        'bmi': metrics['bmi'], 'resting_hr': metrics['hr'], 'blood_pressure': f"{metrics['bp_sys']}/{metrics['bp_dia']}",
+        'bp_systolic': metrics['bp_sys'], 'bp_diastolic': metrics['bp_dia'],
+        'readiness_score': st.session_state.readiness_score, 'social_mode_active': st.session_state.social_mode,
+        'micro_workouts_done': st.session_state.micro_workouts, 'water_intake_cc': st.session_state.water_intake,
+        # 週末勾選框綁定同名的 session_state 鍵；平日不會畫出勾選框，鍵可能已被清掉
+        'weekend_fasting': st.session_state.get('weekend_fasting', False),
+        'weekend_walk': st.session_state.get('weekend_walk', False),
+    }
+
+
+def autosave(full=False):
+    # full=True (更新數值、儲存按鈕) 才以目前狀態覆寫整列
+    journal.get_journal().record(st.session_state.loaded_user, st.session_state.log_date, today_record(), full)
+
+
+def save_today():
+    # 儲存按鈕：立即寫入今日整列，回傳是否寫入成功；失敗的快照留在佇列，背景執行緒會再重試
+    autosave(full=True)
+    failed = journal.get_journal().flush()
+    return (st.session_state.loaded_user, st.session_state.log_date) not in failed
+
+
+def forget_day(user_id, date):
+    # 編輯頁直接修改/刪除紀錄前呼叫：丟掉該天尚未寫入的快照；改的是今天時，下次重跑重新載入今日狀態
+    journal.get_journal().discard(user_id, date)
+    if (st.session_state.get('loaded_user'), st.session_state.get('log_date')) == (user_id, date):
+        del st.session_state['loaded_user']
+
+
+def roll_over():
+    # 頁面跨過午夜仍開著時，fragment 單獨重跑不會經過 app 的日期檢查；點擊前先切到新的一天，回傳是否切換
+    today = datetime.date.today().isoformat()
+    if st.session_state.log_date == today:
+        return False
+    user_id = st.session_state.loaded_user
+    start_day(user_id, today, *db.fetch_profile(db.get_db(), user_id))
+    return True
+
+
+def start_day(user_id, date, display_name, metrics):
+    # 切換使用者、新 session 或跨日：載入基準數值；當天已有紀錄 (含自動存檔) 就接續，否則歸零今日累計
+    st.session_state.loaded_user = user_id
+    st.session_state.log_date = date
+    st.session_state.display_name = display_name
+    st.session_state.metrics = metrics
+    st.session_state.social_mode = False
+    st.session_state.micro_workouts = 0
+    st.session_state.water_intake = 0
+    st.session_state.weekend_fasting = False
+    st.session_state.weekend_walk = False
+
+    # 先把尚未寫入的快照寫完，才讀得到其他 session 剛按下的狀態
+    journal.get_journal().flush()
+    row = db.fetch_log(db.get_db(), user_id, date)
+    if row is not None:
+        *logged_metrics, social_mode, micro_workouts, water_intake, weekend_fasting, weekend_walk, _ = row
+        # db.fetch_log 的身體數值欄位與 profiles 表同順序，沿用 db.PROFILE_METRICS 對應到 metrics 的鍵
+        metrics.update({key: value for key, value in zip(db.PROFILE_METRICS.values(), logged_metrics) if value is not None})
+        st.session_state.social_mode = bool(social_mode)
+        st.session_state.micro_workouts = micro_workouts or 0
+        st.session_state.water_intake = water_intake or 0
+        st.session_state.weekend_fasting = bool(weekend_fasting)
+        st.session_state.weekend_walk = bool(weekend_walk)
+    recompute()
+
+
+def update_metrics(new_metrics):
+    st.session_state.metrics.update(new_metrics)
+    recompute()
+    autosave(full=True)
+
+
+def drink(cc):
+    roll_over()
+    st.session_state.water_intake += cc
+    recompute()
+    autosave()
+
+
+def complete_workout():
+    roll_over()
+    st.session_state.micro_workouts += 1
+    recompute()
+    autosave()
+
+
+def set_social_mode(active):
+    roll_over()
+    st.session_state.social_mode = active
+    recompute()
+    autosave()
+
+
+def toggle_weekend_reset():
+    # 勾選框的值已寫進 session_state；跨日後那一格屬於前一天，改載入新的一天而不記錄這次勾選
+    if not roll_over():
+        autosave()
@@ -0,0 +1,124 @@
+import datetime
+
+from readiness import NORMAL_WATER_GOAL, SOCIAL_WATER_GOAL
+
+# ==========================================
+# 🗂️ 週 / 月彙總表 (log_summary)：寫入時增量維護
+# ==========================================
+# 每位使用者每週 (週一開始)、每月各一列，只存加總與天數，平均值在讀取時才除。
+# 存檔/修改/刪除在同一個交易內先扣掉舊的那一天、再加上新的那一天，週/月報表只需讀 O(週數) 列。
+# 批次匯入改用 rebuild() 依日期範圍重算；彙總表與明細不一致時可用 manage.py rebuild-summary 修復。
+PERIODS = ('week', 'month')
+
+# 計算彙總需要的明細欄位 (順序即 contribution() 的輸入順序)
+SOURCE_COLUMNS = (
+    'date', 'visceral_fat', 'weight', 'body_age', 'resting_hr',
+    'social_mode_active', 'water_intake_cc', 'weekend_fasting', 'weekend_walk',
+)
+
+# 有平均值的欄位：分別記錄加總與有值的天數 (NULL 不算)
+AVERAGE_COLUMNS = ('visceral_fat', 'weight', 'body_age', 'resting_hr')
+
+SUMMARY_COLUMNS = (
+    ('days',)
+    + tuple(f'{col}_{part}' for col in AVERAGE_COLUMNS for part in ('sum', 'days'))
+    + ('social_days', 'water_goal_days', 'weekend_days', 'weekend_fasting_days', 'weekend_walk_days')
+)
+
+SQL_SELECT_SOURCE = f"SELECT {', '.join(SOURCE_COLUMNS)} FROM health_logs WHERE user_id=? AND date=?"
+SQL_ADD = f'''
+    INSERT INTO log_summary (user_id, period, period_start, {', '.join(SUMMARY_COLUMNS)})
+    VALUES (?, ?, ?, {', '.join('?' * len(SUMMARY_COLUMNS))})
+    ON CONFLICT (user_id, period, period_start) DO UPDATE SET
+    {', '.join(f'{col}={col}+excluded.{col}' for col in SUMMARY_COLUMNS)}
+'''
+SQL_PRUNE = "DELETE FROM log_summary WHERE user_id=? AND period=? AND period_start=? AND days<=0"
+SQL_SELECT_PERIODS = f"SELECT period_start, {', '.join(SUMMARY_COLUMNS)} FROM log_summary WHERE user_id=? AND period=? ORDER BY period_start"
+
+# 重算：以 SQL 分組一次產生整段範圍，規則必須與 contribution() 一致
+_PERIOD_START_SQL = {
+    'week': "date(date, '-' || ((CAST(strftime('%w', date) AS INTEGER) + 6) % 7) || ' days')",
+    'month': "strftime('%Y-%m-01', date)",
+}
+_IS_SOCIAL_SQL = "CASE WHEN social_mode_active THEN 1 ELSE 0 END"
+# 週末重置的勾選只在週六、日才算數 (達成率的分母是週末天數)
+_IS_WEEKEND_SQL = "strftime('%w', date) IN ('0', '6')"
+_AGGREGATES_SQL = ', '.join(
+    ['COUNT(*)']
+    + [f'{agg}({col})' for col in AVERAGE_COLUMNS for agg in ('TOTAL', 'COUNT')]
+    + [
+        f"SUM({_IS_SOCIAL_SQL})",
+        f"SUM(CASE WHEN COALESCE(water_intake_cc, 0) >= CASE WHEN social_mode_active THEN {SOCIAL_WATER_GOAL} ELSE {NORMAL_WATER_GOAL} END THEN 1 ELSE 0 END)",
+        f"SUM(CASE WHEN {_IS_WEEKEND_SQL} THEN 1 ELSE 0 END)",
+        f"SUM(CASE WHEN {_IS_WEEKEND_SQL} AND weekend_fasting THEN 1 ELSE 0 END)",
+        f"SUM(CASE WHEN {_IS_WEEKEND_SQL} AND weekend_walk THEN 1 ELSE 0 END)",
+    ]
+)
+SQL_REBUILD = {
+    period: f'''
+        INSERT INTO log_summary (user_id, period, period_start, {', '.join(SUMMARY_COLUMNS)})
+        SELECT user_id, '{period}', {expr} AS period_start, {_AGGREGATES_SQL}
+        FROM health_logs
+        WHERE user_id=? AND date BETWEEN ? AND ?
+        GROUP BY period_start
+        HAVING period_start BETWEEN ? AND ?
+    '''
+    for period, expr in _PERIOD_START_SQL.items()
+}
+SQL_DELETE_RANGE = "DELETE FROM log_summary WHERE user_id=? AND period_start BETWEEN ? AND ?"
+
+
+def period_starts(date):
+    day = datetime.date.fromisoformat(date)
+    return (
+        ('week', (day - datetime.timedelta(days=day.weekday())).isoformat()),
+        ('month', day.replace(day=1).isoformat()),
+    )
+
+
+def contribution(row):
+    # 一天的明細 (SOURCE_COLUMNS 順序) 對彙總各欄的貢獻
+    date, *averages, social, water, fasting, walk = row
+    values = [1]
+    for value in averages:
+        values += [0.0, 0] if value is None else [value, 1]
+    social = bool(social)
+    weekend = datetime.date.fromisoformat(date).weekday() >= 5
+    values += [
+        int(social),
+        int((water or 0) >= (SOCIAL_WATER_GOAL if social else NORMAL_WATER_GOAL)),
+        int(weekend),
+        # 匯入檔可能在平日帶有勾選；只算週末的，達成率才不會超過 100%
+        int(weekend and bool(fasting)),
+        int(weekend and bool(walk)),
+    ]
+    return values
+
+
+def apply(conn, user_id, old_row, new_row):
+    # 需在寫入明細的同一個交易內呼叫；old_row / new_row 為 None 代表新增 / 刪除
+    if old_row is not None:
+        negated = [-value for value in contribution(old_row)]
+        for period, start in period_starts(old_row[0]):
+            conn.execute(SQL_ADD, (user_id, period, start, *negated))
+            conn.execute(SQL_PRUNE, (user_id, period, start))
+    if new_row is not None:
+        values = contribution(new_row)
+        for period, start in period_starts(new_row[0]):
+            conn.execute(SQL_ADD, (user_id, period, start, *values))
+
+
+def rebuild(conn, user_id=None, start=None, end=None):
+    # 依明細重算彙總 (需在交易內呼叫)，回傳寫入的彙總列數。
+    # user_id 為 None 時重建所有使用者；指定 start/end 時只重算涵蓋這段日期的週與月
+    if user_id is None:
+        conn.execute("DELETE FROM log_summary")
+        users = [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM health_logs").fetchall()]
+        return sum(rebuild(conn, uid) for uid in users)
+
+    # 從涵蓋 start 的週/月開頭 (取較早者) 重算到 end；這些週/月的每一天都落在 [low, end + 31 天] 內
+    low = min(start for _, start in period_starts(start)) if start else '0000-00-00'
+    high = (datetime.date.fromisoformat(end) + datetime.timedelta(days=31)).isoformat() if end else '9999-99-99'
+    end = end or '9999-99-99'
+    conn.execute(SQL_DELETE_RANGE, (user_id, low, end))
+    return sum(conn.execute(sql, (user_id, low, high, low, end)).rowcount for sql in SQL_REBUILD.values())
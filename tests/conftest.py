@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# 從 repo 根目錄或 tests/ 執行都能 import app 的模組
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import migrations
+
+
+@pytest.fixture
+def database(tmp_path):
+    # 暫存檔上的 Database，已遷移到最新版本；不經過 st.cache_resource
+    database = db.Database(str(tmp_path / 'test.db'))
+    migrations.migrate(database.conn)
+    yield database
+    database.close()
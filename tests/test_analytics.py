@@ -0,0 +1,74 @@
+import math
+
+import pytest
+
+import analytics
+import db
+import summary
+
+# (日期, 體重, 喝水量, 有應酬?)；2024-01-15 那一週沒有紀錄
+DAYS = [
+    ('2024-01-01', 70.0, 2000, False),
+    ('2024-01-02', 71.0, 1500, False),
+    ('2024-01-03', 72.0, 3000, True),
+    ('2024-01-08', 74.0, 2500, True),
+    ('2024-01-09', 76.0, 2000, False),
+    ('2024-01-22', 80.0, 0, False),
+]
+
+
+@pytest.fixture
+def trends(database):
+    for date, weight, water, social in DAYS:
+        db.save_log(database, db.DEFAULT_USER, {
+            'date': date, 'height': 170.0, 'weight': weight, 'actual_age': 54, 'body_age': 60,
+            'visceral_fat': 20.0, 'muscle_mass': 30.0, 'bmi': 24.0, 'resting_hr': 62,
+            'blood_pressure': '120/80', 'bp_systolic': 120, 'bp_diastolic': 80,
+            'readiness_score': 50, 'social_mode_active': social, 'micro_workouts_done': 0, 'water_intake_cc': water,
+            'weekend_fasting': False, 'weekend_walk': False,
+        })
+    recent = database.read_frame(analytics.SQL_SELECT_RECENT, (db.DEFAULT_USER, db.DEFAULT_USER, '-395 days'))
+    return analytics.compute_trends(recent, db.fetch_summary(database, db.DEFAULT_USER, 'week'))
+
+
+def test_rolling_means_use_calendar_windows(trends):
+    # 7 日窗 (01-02, 01-09] 只含 01-03、01-08、01-09
+    assert trends['rolling_7'].loc['2024-01-09', 'weight'] == pytest.approx(74.0)
+    assert trends['rolling_7'].loc['2024-01-22', 'weight'] == pytest.approx(80.0)
+    assert trends['rolling_30'].loc['2024-01-22', 'weight'] == pytest.approx(443 / 6)
+
+
+def test_week_over_week_skips_empty_weeks(trends):
+    weekly = trends['weekly']['weight']
+    assert [day.strftime('%Y-%m-%d') for day in weekly.index] == ['2024-01-01', '2024-01-08', '2024-01-15', '2024-01-22']
+    assert weekly.tolist()[:2] == pytest.approx([71.0, 75.0])
+    assert math.isnan(weekly['2024-01-15'])
+
+    # 空白週前後都沒有可比較的相鄰週
+    delta = trends['week_over_week']['weight']
+    assert delta['2024-01-08'] == pytest.approx(4.0)
+    assert math.isnan(delta['2024-01-15']) and math.isnan(delta['2024-01-22'])
+    assert trends['weekly_social_days'].tolist() == [1, 1, 0, 0]
+
+
+def test_water_goal_hit_rate(trends):
+    # 平日目標 2000cc、應酬日 3000cc：01-01、01-03、01-09 達標
+    assert trends['days'] == 6
+    assert trends['water_goal_hit_rate'] == pytest.approx(0.5)
+    weekly = trends['weekly_water_hit_rate']
+    assert weekly['2024-01-01'] == pytest.approx(2 / 3)
+    assert weekly['2024-01-08'] == pytest.approx(0.5)
+    assert math.isnan(weekly['2024-01-15'])
+    assert weekly['2024-01-22'] == 0
+
+
+def test_rollup_frame_averages_skip_missing_values():
+    columns = dict.fromkeys(summary.SUMMARY_COLUMNS, 0)
+    columns.update(days=2, weight_sum=150.0, weight_days=2, social_days=1, water_goal_days=1)
+    frame = analytics.rollup_frame([('2024-02-01', *columns.values())])[0]
+    row = frame.loc['2024-02-01']
+    assert row['weight'] == pytest.approx(75.0)
+    # 沒有任何數值的欄位平均為空，而不是 0
+    assert math.isnan(row['visceral_fat'])
+    assert row['water_goal_hit_rate'] == pytest.approx(0.5)
+    assert math.isnan(row['weekend_fasting_rate'])
@@ -0,0 +1,106 @@
+import pytest
+
+import db
+import journal
+
+DATE = '2024-03-01'
+
+
+def make_record(water=0, weight=70.0):
+    return {
+        'date': DATE, 'height': 170.0, 'weight': weight, 'actual_age': 54, 'body_age': 60,
+        'visceral_fat': 20.0, 'muscle_mass': 30.0, 'bmi': 24.0, 'resting_hr': 62,
+        'blood_pressure': '120/80', 'bp_systolic': 120, 'bp_diastolic': 80,
+        'readiness_score': 50, 'social_mode_active': False, 'micro_workouts_done': 0, 'water_intake_cc': water,
+        'weekend_fasting': False, 'weekend_walk': False,
+    }
+
+
+@pytest.fixture
+def log(database):
+    # 背景執行緒的間隔設得很長，測試裡只靠手動 flush() 寫入
+    log = journal.Journal(database, interval=3600)
+    yield log
+    log.close()
+
+
+def fetch_water(database):
+    return db.fetch_log(database, db.DEFAULT_USER, DATE)[12]
+
+
+def test_failed_flush_reports_and_requeues(database, log):
+    database.conn.execute("CREATE TRIGGER reject BEFORE INSERT ON health_logs BEGIN SELECT RAISE(ABORT, 'read-only'); END")
+    log.record(db.DEFAULT_USER, DATE, make_record(water=500), full=True)
+    assert log.flush() == [(db.DEFAULT_USER, DATE)]
+    assert db.fetch_log(database, db.DEFAULT_USER, DATE) is None
+    assert list(log.pending) == [(db.DEFAULT_USER, DATE)]
+
+    database.conn.execute("DROP TRIGGER reject")
+    assert log.flush() == []
+    assert fetch_water(database) == 500
+    assert log.pending == {}
+
+
+def test_record_keeps_latest_snapshot_and_full_flag(log):
+    log.record(db.DEFAULT_USER, DATE, make_record(water=250), full=True)
+    log.record(db.DEFAULT_USER, DATE, make_record(water=500))
+    # 較新的快照只改今日欄位，但先前那份要寫整列：合併後仍寫整列
+    record, full = log.pending[(db.DEFAULT_USER, DATE)]
+    assert (record['water_intake_cc'], full) == (500, True)
+
+    log.record(db.DEFAULT_USER, '2024-03-02', make_record())
+    assert log.pending[(db.DEFAULT_USER, '2024-03-02')][1] is False
+
+
+def test_discard_drops_pending_snapshot(database, log):
+    log.record(db.DEFAULT_USER, DATE, make_record(water=500), full=True)
+    log.record('second', DATE, make_record(water=250), full=True)
+    log.discard(db.DEFAULT_USER, DATE)
+    assert log.flush() == []
+    assert db.fetch_log(database, db.DEFAULT_USER, DATE) is None
+    assert db.fetch_log(database, 'second', DATE) is not None
+
+
+def test_unexpected_error_requeues_and_keeps_full_flag(database, log, monkeypatch):
+    write_log = db.write_log
+
+    def broken(*args, **kwargs):
+        raise ValueError('boom')
+
+    monkeypatch.setattr(db, 'write_log', broken)
+    log.record(db.DEFAULT_USER, DATE, make_record(water=250, weight=80.0), full=True)
+    assert log.flush() == [(db.DEFAULT_USER, DATE)]
+    # 失敗期間又有一次只改今日欄位的點擊：保留較新的快照，但仍要寫整列
+    log.record(db.DEFAULT_USER, DATE, make_record(water=500, weight=80.0))
+    assert log.pending[(db.DEFAULT_USER, DATE)][1] is True
+
+    monkeypatch.setattr(db, 'write_log', write_log)
+    assert log.flush() == []
+    row = db.fetch_log(database, db.DEFAULT_USER, DATE)
+    assert (row[1], row[12]) == (80.0, 500)
+
+
+def test_background_thread_survives_errors(database, monkeypatch):
+    monkeypatch.setattr(journal.Journal, '_flush', lambda self: 1 / 0)
+    log = journal.Journal(database, interval=0.01)
+    try:
+        log.stopped.wait(0.1)
+        assert log.thread.is_alive()
+    finally:
+        monkeypatch.undo()
+        log.close()
+
+
+def test_live_snapshot_keeps_edited_metrics(database, log):
+    db.save_log(database, db.DEFAULT_USER, make_record(water=250, weight=70.0))
+    # 編輯頁把體重改成 75，之後今日面板再按一次喝水
+    db.update_log(database, db.DEFAULT_USER, DATE, make_record(water=250, weight=75.0))
+    log.record(db.DEFAULT_USER, DATE, make_record(water=500, weight=70.0))
+    assert log.flush() == []
+    row = db.fetch_log(database, db.DEFAULT_USER, DATE)
+    assert (row[1], row[12]) == (75.0, 500)
+
+    # 更新數值 / 儲存按鈕 (full=True) 才覆寫整列
+    log.record(db.DEFAULT_USER, DATE, make_record(water=500, weight=72.0), full=True)
+    log.flush()
+    assert db.fetch_log(database, db.DEFAULT_USER, DATE)[1] == 72.0
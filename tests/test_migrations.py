@@ -0,0 +1,118 @@
+import sqlite3
+
+import numpy as np
+
+import migrations
+import readiness
+import summary
+
+# 原始 app.py 的 init_db 建出的結構 (沒有 user_version，身高/體重是後來 ALTER 補上的)
+LEGACY_SCHEMA = (
+    '''
+    CREATE TABLE health_logs (
+        date TEXT PRIMARY KEY,
+        actual_age INTEGER,
+        body_age INTEGER,
+        visceral_fat REAL,
+        muscle_mass REAL,
+        bmi REAL,
+        resting_hr INTEGER,
+        blood_pressure TEXT,
+        readiness_score INTEGER,
+        social_mode_active BOOLEAN,
+        micro_workouts_done INTEGER,
+        water_intake_cc INTEGER
+    )
+    ''',
+    "ALTER TABLE health_logs ADD COLUMN height REAL DEFAULT 170.0",
+    "ALTER TABLE health_logs ADD COLUMN weight REAL DEFAULT 70.0",
+)
+
+LEGACY_ROWS = [
+    ('2024-01-01', 54, 69, 25.0, 26.7, 33.8, 63, '119/79', 60, 0, 2, 2000, 170.0, 70.0),
+    ('2024-01-02', 54, 68, 24.5, 26.9, 33.5, 62, ' 135 / 85 ', 55, 1, 0, 3000, 170.0, 69.5),
+    ('2024-01-03', 54, 68, 24.0, 27.0, 33.2, 61, '高/低', 58, 0, 1, 1500, 170.0, 69.0),
+    ('2024-01-04', 54, 68, 24.0, 27.0, 33.2, 61, '12a/8b0', 58, 0, 1, 1500, 170.0, 69.0),
+]
+
+
+def _connect(path):
+    return sqlite3.connect(path, isolation_level=None)
+
+
+def _create_legacy(path):
+    conn = _connect(path)
+    for sql in LEGACY_SCHEMA:
+        conn.execute(sql)
+    conn.executemany(
+        "INSERT INTO health_logs (date, actual_age, body_age, visceral_fat, muscle_mass, bmi, resting_hr, blood_pressure, "
+        "readiness_score, social_mode_active, micro_workouts_done, water_intake_cc, height, weight) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        LEGACY_ROWS,
+    )
+    return conn
+
+
+def test_migrate_fresh_file(tmp_path):
+    conn = _connect(str(tmp_path / 'fresh.db'))
+    assert migrations.migrate(conn) == migrations.SCHEMA_VERSION
+    assert migrations.schema_version(conn) == migrations.SCHEMA_VERSION
+    assert conn.execute("SELECT user_id, display_name FROM profiles").fetchall() == [('default', '蘇區長')]
+    assert conn.execute("SELECT COUNT(*) FROM health_logs").fetchone()[0] == 0
+
+
+def test_migrate_legacy_file_keeps_data(tmp_path):
+    conn = _create_legacy(str(tmp_path / 'legacy.db'))
+    assert migrations.schema_version(conn) == 0
+    assert migrations.migrate(conn) == migrations.SCHEMA_VERSION
+
+    rows = conn.execute(
+        "SELECT user_id, date, visceral_fat, weight, blood_pressure, bp_systolic, bp_diastolic, water_intake_cc "
+        "FROM health_logs ORDER BY date"
+    ).fetchall()
+    assert rows == [
+        ('default', '2024-01-01', 25.0, 70.0, '119/79', 119, 79, 2000),
+        ('default', '2024-01-02', 24.5, 69.5, ' 135 / 85 ', 135, 85, 3000),
+        # 無法解析的血壓保留原字串，數值欄位維持 NULL
+        ('default', '2024-01-03', 24.0, 69.0, '高/低', None, None, 1500),
+        ('default', '2024-01-04', 24.0, 69.0, '12a/8b0', None, None, 1500),
+    ]
+    pk = [(info[1], info[5]) for info in conn.execute("PRAGMA table_info(health_logs)").fetchall() if info[5]]
+    assert sorted(pk, key=lambda item: item[1]) == [('user_id', 1), ('date', 2)]
+
+
+def test_migrated_summary_matches_current_rebuild(tmp_path):
+    # 第 5 步用的是固定的 SQL 副本；目前的 summary.rebuild() 規則相同時，結果必須一致
+    conn = _create_legacy(str(tmp_path / 'legacy.db'))
+    migrations.migrate(conn)
+    migrated = conn.execute("SELECT * FROM log_summary ORDER BY user_id, period, period_start").fetchall()
+    conn.execute("BEGIN")
+    summary.rebuild(conn)
+    conn.execute("COMMIT")
+    assert migrated
+    assert conn.execute("SELECT * FROM log_summary ORDER BY user_id, period, period_start").fetchall() == migrated
+
+
+def test_migrate_is_idempotent(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    _create_legacy(path).close()
+    assert migrations.migrate(_connect(path)) == migrations.SCHEMA_VERSION
+
+    conn = _connect(path)
+    before = conn.execute("SELECT * FROM health_logs ORDER BY date").fetchall()
+    assert migrations.migrate(conn) == 0
+    assert conn.execute("SELECT * FROM health_logs ORDER BY date").fetchall() == before
+
+
+def test_blood_pressure_backfill_agrees_with_python_parser():
+    samples = [
+        '119/79', ' 135 / 85 ', '12a/8b0', '120/80/70', '120/', '/80', '120.5/80', '1e2/80', '+120/80', '080/60', '', '高/低',
+    ]
+    conn = sqlite3.connect(':memory:')
+    in_sql = [
+        bool(conn.execute(f"SELECT {migrations.STRICT_BLOOD_PRESSURE} FROM (SELECT ? AS blood_pressure)", (value,)).fetchone()[0])
+        for value in samples
+    ]
+    bp_sys, bp_dia = readiness.parse_blood_pressure(samples)
+    in_python = [not (np.isnan(s) or np.isnan(d)) for s, d in zip(bp_sys, bp_dia)]
+    assert in_sql == in_python == [True, True] + [False] * 10
@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+
+import readiness
+from readiness import NORMAL_WATER_GOAL, SOCIAL_WATER_GOAL, calculate_readiness, calculate_readiness_batch
+
+
+def _scalar(rows, water_goal=None):
+    return [
+        calculate_readiness(
+            vf, hr, bp, body_age, actual_age, social, workouts, water,
+            water_goal if water_goal is not None else (SOCIAL_WATER_GOAL if social else NORMAL_WATER_GOAL),
+        )
+        for vf, hr, bp, body_age, actual_age, social, workouts, water in rows
+    ]
+
+
+def _batch(rows, water_goal=None):
+    return calculate_readiness_batch(*map(list, zip(*rows)), water_goal=water_goal).tolist()
+
+
+def test_batch_matches_scalar_on_random_rows():
+    rng = random.Random(0)
+    rows = [
+        (
+            round(rng.uniform(0, 40), 1), rng.randint(40, 110), rng.randint(90, 190), rng.randint(30, 90), rng.randint(30, 90),
+            rng.random() < 0.4, rng.randint(0, 12), rng.choice([0, 1500, 1999, 2000, 2500, 2999, 3000, 4000]),
+        )
+        for _ in range(20000)
+    ]
+    assert _batch(rows) == _scalar(rows)
+    assert _batch(rows, water_goal=2500) == _scalar(rows, water_goal=2500)
+
+
+def test_water_goal_switches_with_social_mode():
+    # 2000cc 在平常日達標 (+5)，應酬日目標是 3000cc 所以不加分
+    normal = (10, 65, 120, 50, 50, False, 0, NORMAL_WATER_GOAL)
+    social = (10, 65, 120, 50, 50, True, 0, NORMAL_WATER_GOAL)
+    social_hit = (10, 65, 120, 50, 50, True, 0, SOCIAL_WATER_GOAL)
+    assert _scalar([normal, social, social_hit]) == [100, 80, 85]
+    assert _batch([normal, social, social_hit]) == [100, 80, 85]
+
+
+def test_truncation_and_clamp():
+    rows = [
+        (10.3, 65, 120, 50, 50, False, 0, 0),    # 100 - 0.45 = 99.55 -> 99 (向零截斷)
+        (60, 120, 200, 90, 40, True, 0, 0),      # 遠低於 0 -> 0
+        (10, 60, 110, 40, 50, False, 10, 5000),  # 100 + 30 + 5 -> 100
+        (0, 0, 0, 0, 0, False, 0, 0),
+    ]
+    expected = [99, 0, 100, 100]
+    assert _scalar(rows) == expected
+    assert _batch(rows) == expected
+
+
+def test_readiness_for_frame_parses_blood_pressure_strings():
+    import pandas as pd
+    df = pd.DataFrame({
+        'visceral_fat': [25.0, 25.0], 'resting_hr': [63, 63], 'blood_pressure': ['140/90', 'bad'],
+        'body_age': [69, 69], 'actual_age': [54, 54], 'social_mode_active': [0, 0],
+        'micro_workouts_done': [0, 0], 'water_intake_cc': [2000, 2000],
+    })
+    # 無法解析的血壓不扣分
+    scores = readiness.readiness_for_frame(df)
+    assert isinstance(scores, np.ndarray)
+    assert scores.tolist() == [
+        calculate_readiness(25.0, 63, 140, 69, 54, False, 0, 2000, NORMAL_WATER_GOAL),
+        calculate_readiness(25.0, 63, 0, 69, 54, False, 0, 2000, NORMAL_WATER_GOAL),
+    ]
@@ -0,0 +1,101 @@
+import datetime
+import io
+import random
+
+import pytest
+
+import analytics
+import db
+import summary
+import transfer
+
+USERS = ('default', 'second')
+FIRST_DAY = datetime.date(2024, 1, 20)
+
+
+def random_date(rng):
+    # 跨多個週與月的邊界
+    return (FIRST_DAY + datetime.timedelta(days=rng.randrange(70))).isoformat()
+
+
+def is_weekend(date):
+    return datetime.date.fromisoformat(date).weekday() >= 5
+
+
+def random_record(rng, date):
+    bp_sys, bp_dia = rng.randint(100, 150), rng.randint(60, 95)
+    weekend = is_weekend(date)
+    return {
+        'date': date, 'height': 170.0, 'weight': rng.choice([None, round(rng.uniform(60, 90), 1)]),
+        'actual_age': 54, 'body_age': rng.choice([None, rng.randint(50, 65)]),
+        'visceral_fat': rng.choice([None, round(rng.uniform(8, 25), 1)]), 'muscle_mass': 30.0, 'bmi': 24.0,
+        'resting_hr': rng.choice([None, rng.randint(55, 85)]),
+        'blood_pressure': f"{bp_sys}/{bp_dia}", 'bp_systolic': bp_sys, 'bp_diastolic': bp_dia,
+        'readiness_score': rng.randint(0, 100), 'social_mode_active': rng.random() < 0.3,
+        'micro_workouts_done': rng.randint(0, 5), 'water_intake_cc': rng.choice([0, 1500, 2000, 2500, 3000]),
+        'weekend_fasting': weekend and rng.random() < 0.5, 'weekend_walk': weekend and rng.random() < 0.5,
+    }
+
+
+def random_csv(rng, rows):
+    lines = ['user_id,date,visceral_fat,resting_hr,blood_pressure,body_age,actual_age,weight,social_mode_active,water_intake_cc,weekend_walk']
+    for _ in range(rows):
+        date = random_date(rng)
+        lines.append(','.join(map(str, (
+            rng.choice(USERS), date, round(rng.uniform(8, 25), 1), rng.randint(55, 85),
+            f"{rng.randint(100, 150)}/{rng.randint(60, 95)}", rng.randint(50, 65), 54,
+            rng.choice(['', round(rng.uniform(60, 90), 1)]), rng.randint(0, 1), rng.choice([0, 2000, 3000]),
+            rng.randint(0, 1) if is_weekend(date) else 0,
+        ))))
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+def summary_rows(database):
+    return database.query_all("SELECT * FROM log_summary ORDER BY user_id, period, period_start")
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_summary_matches_rebuild(database, seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        user_id, date = rng.choice(USERS), random_date(rng)
+        action = rng.random()
+        if action < 0.4:
+            db.save_log(database, user_id, random_record(rng, date))
+        elif action < 0.6:
+            # journal 的自動存檔 (已有紀錄時只更新今日面板的欄位)
+            with database.transaction(user_id) as conn:
+                db.write_log(conn, user_id, random_record(rng, date), live_only=True)
+        elif action < 0.8:
+            db.update_log(database, user_id, date, random_record(rng, date))
+        elif action < 0.95:
+            db.delete_log(database, user_id, date)
+        else:
+            transfer.import_file(database, random_csv(rng, 20), 'csv', chunk_rows=7)
+
+    incremental = summary_rows(database)
+    with database.transaction(None) as conn:
+        summary.rebuild(conn)
+    rebuilt = summary_rows(database)
+
+    assert [row[:3] for row in incremental] == [row[:3] for row in rebuilt]
+    for got, expected in zip(incremental, rebuilt):
+        assert got[3:] == pytest.approx(expected[3:])
+
+
+def test_weekday_weekend_flags_do_not_inflate_rates(database):
+    # 匯入週一到週日每天都勾選的檔案：只有週六、日算數，達成率不超過 100%
+    lines = ['date,visceral_fat,resting_hr,blood_pressure,body_age,actual_age,weekend_fasting,weekend_walk']
+    for offset in range(7):
+        lines.append(f"{datetime.date(2024, 3, 4 + offset).isoformat()},20.0,62,120/80,60,54,1,{offset % 2}")
+    transfer.import_file(database, io.StringIO('\n'.join(lines) + '\n'), 'csv')
+    # 逐日存檔 (增量維護) 也套用相同規則
+    rng = random.Random(0)
+    for offset in range(7):
+        record = random_record(rng, datetime.date(2024, 3, 11 + offset).isoformat())
+        db.save_log(database, db.DEFAULT_USER, dict(record, weekend_fasting=True, weekend_walk=True))
+
+    weeks = analytics.rollup_frame(db.fetch_summary(database, db.DEFAULT_USER, 'week'))[0]
+    assert weeks['weekend_fasting_rate'].tolist() == [1.0, 1.0]
+    assert weeks['weekend_walk_rate'].tolist() == [0.5, 1.0]
+    assert (weeks[['weekend_fasting_rate', 'weekend_walk_rate']] <= 1).all(axis=None)
@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+import db
+import transfer
+
+MINIMAL_CSV = "date,visceral_fat,resting_hr,blood_pressure,body_age,actual_age\n2024-03-01,20.5,62,121/78,60,54\n"
+
+
+def test_import_with_only_required_columns_uses_defaults(database):
+    assert transfer.import_file(database, io.StringIO(MINIMAL_CSV), 'csv') == 1
+    row = db.fetch_log(database, db.DEFAULT_USER, '2024-03-01')
+    height, weight, actual_age, body_age, vf, muscle, bmi, hr, bp_sys, bp_dia, social, workouts, water, fasting, walk, bp_text = row
+    assert (height, weight, muscle, bmi) == (170.0, 70.0, 30.0, 24.0)
+    assert (actual_age, body_age, vf, hr, bp_sys, bp_dia, bp_text) == (54, 60, 20.5, 62, 121, 78, '121/78')
+    assert (social, workouts, water, fasting, walk) == (0, 0, 0, 0, 0)
+
+
+@pytest.mark.parametrize('line', [
+    "2024-03-02,,62,121/78,60,54",       # 必要數值空白
+    "2024-03-02,abc,62,121/78,60,54",    # 必要數值不是數字
+    "2024-03-02,20.5,62,12a/8b0,60,54",  # 血壓格式錯誤
+    "not-a-date,20.5,62,121/78,60,54",
+])
+def test_import_rejects_bad_rows_with_row_number(database, line):
+    source = io.StringIO(MINIMAL_CSV + line + "\n")
+    with pytest.raises(ValueError, match="第 2 列"):
+        transfer.import_file(database, source, 'csv')
+    assert db.count_logs(database, db.DEFAULT_USER, '0000-00-00', '9999-99-99') == 0
+
+
+def test_import_keeps_user_id_as_text(database):
+    source = io.StringIO(
+        "user_id," + MINIMAL_CSV.splitlines()[0] + "\n"
+        "00123,2024-03-01,20.5,62,121/78,60,54\n"
+        ",2024-03-02,20.5,62,121/78,60,54\n"
+    )
+    assert transfer.import_file(database, source, 'csv') == 2
+    assert db.fetch_log(database, '00123', '2024-03-01') is not None
+    assert db.fetch_log(database, db.DEFAULT_USER, '2024-03-02') is not None
+    profiles = [row[0] for row in database.query_all("SELECT user_id FROM profiles ORDER BY user_id")]
+    assert profiles == ['00123', db.DEFAULT_USER]
+
+
+def test_ui_and_cli_csv_exports_match_and_reimport(database, tmp_path):
+    transfer.import_file(database, io.StringIO(MINIMAL_CSV), 'csv')
+    with transfer.csv_file(database, db.DEFAULT_USER) as ui_file:
+        ui_bytes = ui_file.read()
+
+    cli_path = tmp_path / 'export.csv'
+    with open(cli_path, 'w', newline='', encoding=transfer.CSV_ENCODING) as dest:
+        transfer.export_csv(database, dest, db.DEFAULT_USER)
+    assert cli_path.read_bytes() == ui_bytes
+
+    # 帶 BOM 的匯出檔可以原樣匯回同一位使用者
+    assert transfer.import_file(database, io.BytesIO(ui_bytes), 'csv') == 1
+    assert db.count_logs(database, db.DEFAULT_USER, '0000-00-00', '9999-99-99') == 1
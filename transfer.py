@@ -0,0 +1,196 @@
+import csv
+import io
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import db
+import perf
+import readiness
+import summary
+
+# ==========================================
+# 📦 批次匯入 / 匯出 (CSV、Parquet)
+# ==========================================
+# 匯入逐塊讀檔、驗證、批次計算評分，每一塊在一個交易內 upsert 並重算涵蓋到的週/月彙總；
+# 匯出以日期做 keyset 分批讀取，記憶體只保留一批資料。
+CHUNK_ROWS = 5000
+
+# 介面下載與 manage.py export 共用的 CSV 編碼 (加 BOM，Excel 開啟中文才不會亂碼)
+CSV_ENCODING = 'utf-8-sig'
+
+# 匯入檔至少要有這些欄位，其餘欄位可省略並使用預設值；
+# 有 user_id 欄位時可一次匯入多位使用者，否則全部歸到指定的使用者
+REQUIRED_COLUMNS = ('date', 'visceral_fat', 'resting_hr', 'blood_pressure', 'body_age', 'actual_age')
+# 必要欄位中的數值欄：空白或非數字整列拒絕 (評分與編輯頁都需要這些值)
+REQUIRED_NUMERIC = ('visceral_fat', 'resting_hr', 'body_age', 'actual_age')
+
+# 選填欄位省略或空白時使用的值 (與 profiles 的欄位預設值相同)
+DEFAULTS = {
+    'height': 170.0, 'weight': 70.0, 'muscle_mass': 30.0, 'bmi': 24.0,
+    'social_mode_active': 0, 'micro_workouts_done': 0, 'water_intake_cc': 0,
+    'weekend_fasting': 0, 'weekend_walk': 0,
+}
+
+EXPORT_COLUMNS = ('user_id',) + db.LOG_COLUMNS
+
+# Parquet 匯出的固定欄位型別，確保每一批寫出的 schema 一致
+PARQUET_TYPES = {
+    'user_id': 'string', 'date': 'string', 'height': 'float64', 'weight': 'float64', 'actual_age': 'int64', 'body_age': 'int64',
+    'visceral_fat': 'float64', 'muscle_mass': 'float64', 'bmi': 'float64', 'resting_hr': 'int64',
+    'blood_pressure': 'string', 'bp_systolic': 'int64', 'bp_diastolic': 'int64', 'readiness_score': 'int64', 'social_mode_active': 'int64',
+    'micro_workouts_done': 'int64', 'water_intake_cc': 'int64', 'weekend_fasting': 'int64', 'weekend_walk': 'int64',
+}
+
+# 以 (user_id, date) 主鍵做 keyset 分頁
+SQL_EXPORT_USER_BATCH = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM health_logs WHERE user_id=? AND date > ? AND date BETWEEN ? AND ? ORDER BY date LIMIT ?"
+SQL_EXPORT_ALL_BATCH = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM health_logs WHERE (user_id, date) > (?, ?) AND date BETWEEN ? AND ? ORDER BY user_id, date LIMIT ?"
+
+
+def detect_format(path):
+    return 'parquet' if str(path).lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise RuntimeError("Parquet 匯入/匯出需要安裝 pyarrow：pip install pyarrow") from exc
+    return pyarrow
+
+
+# ------------------------------------------
+# 📥 匯入
+# ------------------------------------------
+def iter_chunks(source, fmt='csv', chunk_rows=CHUNK_ROWS):
+    if fmt == 'parquet':
+        pyarrow = _require_pyarrow()
+        for batch in pyarrow.parquet.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        # 帳號、日期與血壓維持字串，避免被 pandas 自動轉型 (例如帳號 00123 變成 123 或 123.0)
+        yield from pd.read_csv(source, chunksize=chunk_rows, dtype={'user_id': str, 'date': str, 'blood_pressure': str})
+
+
+# 驗證並轉成 health_logs 欄位；有錯誤時丟出 ValueError，錯誤訊息含原始檔案的列號
+def prepare_chunk(df, user_id=db.DEFAULT_USER, first_row=0):
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"匯入檔缺少欄位：{', '.join(missing)}")
+
+    out = pd.DataFrame(index=df.index)
+    # 先用 ISO 格式快速解析，失敗的少數列 (例如 2024/1/5) 再逐筆推斷格式
+    dates = pd.to_datetime(df['date'], errors='coerce', format='ISO8601')
+    if dates.isna().any():
+        dates = dates.fillna(pd.to_datetime(df['date'], errors='coerce', format='mixed'))
+    bp_sys, bp_dia = readiness.parse_blood_pressure(df['blood_pressure'])
+    numeric = {col: pd.to_numeric(df[col], errors='coerce') for col in REQUIRED_NUMERIC}
+    problems = {
+        '日期': dates.isna().to_numpy(),
+        '血壓 (收縮壓/舒張壓)': np.isnan(bp_sys) | np.isnan(bp_dia),
+        **{col: values.isna().to_numpy() for col, values in numeric.items()},
+    }
+    bad = np.logical_or.reduce(list(problems.values()))
+    if bad.any():
+        rows = (np.flatnonzero(bad) + first_row + 1)[:5].tolist()
+        fields = '、'.join(name for name, mask in problems.items() if mask.any())
+        raise ValueError(f"第 {', '.join(map(str, rows))} 列的 {fields} 空白或格式錯誤")
+
+    # Parquet 的帳號欄可能是數字型別：先轉成字串再補空白，空白帳號才不會讓整欄變成浮點數
+    out['user_id'] = df['user_id'].astype('string').fillna(user_id).astype(str) if 'user_id' in df else user_id
+    out['date'] = dates.dt.strftime('%Y-%m-%d')
+    for col, values in numeric.items():
+        out[col] = values
+    for col in ('height', 'weight', 'muscle_mass', 'bmi', 'micro_workouts_done', 'water_intake_cc'):
+        out[col] = pd.to_numeric(df[col], errors='coerce').fillna(DEFAULTS[col]) if col in df else DEFAULTS[col]
+    for col in ('social_mode_active', 'weekend_fasting', 'weekend_walk'):
+        out[col] = pd.to_numeric(df[col], errors='coerce').fillna(0) != 0 if col in df else bool(DEFAULTS[col])
+    out['bp_systolic'] = bp_sys
+    out['bp_diastolic'] = bp_dia
+    out['blood_pressure'] = [f"{int(s)}/{int(d)}" for s, d in zip(bp_sys, bp_dia)]
+
+    # 評分一律用目前公式批次重算，與 recompute_all_scores 一致
+    out['readiness_score'] = readiness.readiness_for_frame(out)
+    return out
+
+
+def _to_params(df):
+    # NaN -> None，numpy 純量 -> Python 原生型別
+    columns = list(EXPORT_COLUMNS)
+    frame = df[columns].astype(object).where(df[columns].notna(), None)
+    return frame.itertuples(index=False, name=None)
+
+
+@perf.timed('transfer.import_file')
+def import_file(database, source, fmt=None, chunk_rows=CHUNK_ROWS, user_id=db.DEFAULT_USER):
+    # 回傳匯入筆數；某一塊驗證失敗時，之前已提交的塊會保留
+    fmt = fmt or detect_format(getattr(source, 'name', source))
+    imported = 0
+    for chunk in iter_chunks(source, fmt, chunk_rows):
+        rows = prepare_chunk(chunk, user_id, first_row=imported)
+        # 單一使用者的檔案只讓該使用者的快取失效；多使用者檔案則全部失效
+        with database.transaction(None if 'user_id' in chunk else user_id) as conn:
+            # 檔案中出現的新使用者自動建立 profile (顯示名稱先用 user_id)
+            conn.executemany(db.SQL_INSERT_PROFILE, ((uid, uid) for uid in rows['user_id'].unique()))
+            conn.executemany(db.SQL_UPSERT_LOG, _to_params(rows))
+            # 大量寫入不逐筆增量，改為依這一塊每位使用者的日期範圍重算彙總
+            for uid, dates in rows.groupby('user_id')['date']:
+                summary.rebuild(conn, uid, dates.min(), dates.max())
+        imported += len(rows)
+    return imported
+
+
+# ------------------------------------------
+# 📤 匯出
+# ------------------------------------------
+def iter_batches(database, user_id=None, start=None, end=None, batch_rows=CHUNK_ROWS):
+    # user_id 為 None 時匯出所有使用者；每批查詢之間釋放鎖，匯出大量資料時不會卡住其他 session
+    start, end = start or '0000-00-00', end or '9999-99-99'
+    cursor = ('', '')
+    while True:
+        if user_id is None:
+            rows = database.query_all(SQL_EXPORT_ALL_BATCH, cursor + (start, end, batch_rows))
+        else:
+            rows = database.query_all(SQL_EXPORT_USER_BATCH, (user_id, cursor[1], start, end, batch_rows))
+        if not rows:
+            return
+        yield rows
+        cursor = rows[-1][:2]
+
+
+def export_csv(database, dest, user_id=None, start=None, end=None):
+    # dest 為已開啟的文字檔 (newline='')；回傳匯出筆數
+    writer = csv.writer(dest)
+    writer.writerow(EXPORT_COLUMNS)
+    exported = 0
+    for rows in iter_batches(database, user_id, start, end):
+        writer.writerows(rows)
+        exported += len(rows)
+    return exported
+
+
+def export_parquet(database, dest, user_id=None, start=None, end=None):
+    pyarrow = _require_pyarrow()
+    schema = pyarrow.schema([(col, PARQUET_TYPES[col]) for col in EXPORT_COLUMNS])
+    exported = 0
+    with pyarrow.parquet.ParquetWriter(dest, schema) as writer:
+        for rows in iter_batches(database, user_id, start, end):
+            columns = list(zip(*rows))
+            table = pyarrow.Table.from_arrays([pyarrow.array(col) for col in columns], names=list(EXPORT_COLUMNS))
+            writer.write_table(table.cast(schema, safe=False))
+            exported += len(rows)
+    return exported
+
+
+def csv_file(database, user_id=None, start=None, end=None):
+    # 給 st.download_button 的延遲產生函式使用 (按下下載才執行)：逐批寫進暫存檔，
+    # 不在記憶體裡組出整份字串；回傳未緩衝的二進位檔 (Streamlit 接受 io.RawIOBase)，關閉後自動刪除
+    dest = tempfile.TemporaryFile('w+b', buffering=0)
+    text = io.TextIOWrapper(dest, encoding=CSV_ENCODING, newline='')
+    export_csv(database, text, user_id, start, end)
+    text.flush()
+    text.detach()
+    dest.seek(0)
+    return dest